@@ -15,8 +15,9 @@ from .const import (
     HAS_EVENT_PLATFORM,
     TERNCY_MANU_NAME,
 )
-from .core.gateway import TerncyGateway
+from .core.gateway import TerncyGateway, snapshot_store
 from .hub_monitor import TerncyHubManager
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,6 +37,7 @@ if HAS_EVENT_PLATFORM:
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Terncy integration."""
     # _LOGGER.debug("async_setup %s", config)
+    async_setup_services(hass)
     return True
 
 
@@ -64,6 +66,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    await gateway.async_restore_snapshot()
     gateway.start()
 
     return True
@@ -85,11 +88,20 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the topology snapshot of a removed config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry, device_entry: DeviceEntry
 ) -> bool:
     # reference: https://developers.home-assistant.io/docs/device_registry_index/#removing-devices
     _LOGGER.debug("[%s] Remove device: %s", config_entry.unique_id, device_entry.id)
+    if gateway := hass.data[DOMAIN].get(config_entry.entry_id):
+        for domain, eid in device_entry.identifiers:
+            if domain == DOMAIN:
+                gateway.forget_device_id(eid)
     return True
 
 
@@ -97,6 +109,7 @@ async def entry_update_listener(hass: HomeAssistant, entry: ConfigEntry):
     # https://developers.home-assistant.io/docs/config_entries_options_flow_handler/#signal-updates
     gateway: TerncyGateway = hass.data[DOMAIN][entry.entry_id]
     gateway.logger.debug("[%s] Options updated: %s", entry.unique_id, entry.options)
+    gateway.apply_options()
     if (
         entry.options.get(CONF_EXPORT_DEVICE_GROUPS, True)
         != gateway.export_device_groups
@@ -8,8 +8,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .hass.entity import TerncyEntity
 from .hass.entity_descriptions import TerncyBinarySensorDescription
-from .types import AttrValue
-from .utils import get_attr_value
+from .types import AttrMap
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,15 +24,12 @@ class TerncyBinarySensor(TerncyEntity, BinarySensorEntity):
 
     entity_description: TerncyBinarySensorDescription
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (
-            value := get_attr_value(attrs, self.entity_description.value_attr)
-        ) is not None:
+        if (value := attrs.get(self.entity_description.value_attr)) is not None:
             self._attr_is_on = self.entity_description.value_map.get(value)
-            if self.hass:
-                self.async_write_ha_state()
+            self.async_write_ha_state_if_changed()
 
 
 TerncyEntity.NEW["binary_sensor"] = TerncyBinarySensor
@@ -20,7 +20,7 @@ from homeassistant.const import (
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .hass.entity import TerncyEntity
-from .utils import get_attr_value
+from .types import AttrMap
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -65,12 +65,12 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
 
     _enable_turn_on_off_backwards_compatibility = False  # used in 2024.2~2024.12
 
-    def update_state(self, attrs):
+    def update_state(self, attrs: AttrMap):
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (temp_unit := get_attr_value(attrs, K_AC_TEMP_UNIT)) is not None:
+        if (temp_unit := attrs.get(K_AC_TEMP_UNIT)) is not None:
             if temp_unit == 1:
                 self._attr_precision: float = 0.1
-        if (ac_mode := get_attr_value(attrs, K_AC_MODE)) is not None:
+        if (ac_mode := attrs.get(K_AC_MODE)) is not None:
             if ac_mode == 1:
                 self._attr_hvac_mode = HVACMode.COOL
             elif ac_mode == 2:
@@ -81,11 +81,11 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
                 self._attr_hvac_mode = HVACMode.HEAT
             else:
                 self._attr_hvac_mode = None
-        if (running := get_attr_value(attrs, K_AC_RUNNING)) is not None:
+        if (running := attrs.get(K_AC_RUNNING)) is not None:
             if running == 0:
                 self._attr_hvac_mode = HVACMode.OFF
 
-        if (fan_speed := get_attr_value(attrs, K_AC_FAN_SPEED)) is not None:
+        if (fan_speed := attrs.get(K_AC_FAN_SPEED)) is not None:
             if fan_speed == 1:
                 self._attr_fan_mode = FAN_HIGH
             elif fan_speed == 2:
@@ -95,17 +95,14 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
             else:
                 self._attr_fan_mode = None
 
-        current_temperature = get_attr_value(attrs, K_AC_CURRENT_TEMPERATURE)
+        current_temperature = attrs.get(K_AC_CURRENT_TEMPERATURE)
         if current_temperature is not None and current_temperature != 255:
             self._attr_current_temperature = current_temperature * self._attr_precision
 
-        if (
-            target_temperature := get_attr_value(attrs, K_AC_TARGET_TEMPERATURE)
-        ) is not None:
+        if (target_temperature := attrs.get(K_AC_TARGET_TEMPERATURE)) is not None:
             self._attr_target_temperature = target_temperature
 
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_set_temperature(self, **kwargs) -> None:
         """Set new target temperature."""
@@ -114,7 +111,7 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
             temperature = kwargs[ATTR_TEMPERATURE]
             self._attr_target_temperature = temperature
             await self.api.set_attribute(self.eid, K_AC_TARGET_TEMPERATURE, temperature)
-            self.async_write_ha_state()
+            self.async_write_ha_state_if_changed()
 
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """Set new target fan mode."""
@@ -129,7 +126,7 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
             await self.api.set_attribute(self.eid, K_AC_FAN_SPEED, 4)
         else:
             _LOGGER.warning("Unsupported fan_mode: %s", fan_mode)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new target fan mode."""
@@ -156,7 +153,7 @@ class TerncyClimate(TerncyEntity, ClimateEntity):
                 await self.api.set_attributes(self.eid, attrs)
             else:
                 _LOGGER.warning("Unsupported hvac_mode: %s", hvac_mode)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_turn_on(self) -> None:
         """Turn the entity on."""
@@ -19,10 +19,22 @@ from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
 from .const import (
+    CONF_BULK_CONCURRENCY,
+    CONF_COALESCE_DELAY,
+    CONF_COALESCE_WRITES,
+    CONF_DEBUG_EIDS,
+    CONF_DEBUG_SAMPLING,
     CONF_EXPORT_DEVICE_GROUPS,
     CONF_EXPORT_SCENES,
+    CONF_FAST_START,
     CONF_IP,
     CONF_NAME,
+    CONF_REPORT_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_COALESCE_DELAY,
+    DEFAULT_REPORT_WINDOW,
+    DEFAULT_UNAVAILABLE_GRACE,
     DOMAIN,
     TERNCY_HUB_SVC_NAME,
 )
@@ -214,6 +226,22 @@ class OptionsFlowHandler(OptionsFlow):
             CONF_EXPORT_DEVICE_GROUPS, True
         )
         export_scenes = self.config_entry.options.get(CONF_EXPORT_SCENES, False)
+        fast_start = self.config_entry.options.get(CONF_FAST_START, True)
+        coalesce_writes = self.config_entry.options.get(CONF_COALESCE_WRITES, False)
+        coalesce_delay = self.config_entry.options.get(
+            CONF_COALESCE_DELAY, DEFAULT_COALESCE_DELAY
+        )
+        report_window = self.config_entry.options.get(
+            CONF_REPORT_WINDOW, DEFAULT_REPORT_WINDOW
+        )
+        bulk_concurrency = self.config_entry.options.get(
+            CONF_BULK_CONCURRENCY, DEFAULT_BULK_CONCURRENCY
+        )
+        unavailable_grace = self.config_entry.options.get(
+            CONF_UNAVAILABLE_GRACE, DEFAULT_UNAVAILABLE_GRACE
+        )
+        debug_sampling = self.config_entry.options.get(CONF_DEBUG_SAMPLING, "")
+        debug_eids = self.config_entry.options.get(CONF_DEBUG_EIDS, "")
 
         return self.async_show_form(
             step_id="init",
@@ -223,6 +251,22 @@ class OptionsFlowHandler(OptionsFlow):
                         CONF_EXPORT_DEVICE_GROUPS, default=export_device_groups
                     ): bool,
                     vol.Required(CONF_EXPORT_SCENES, default=export_scenes): bool,
+                    vol.Required(CONF_FAST_START, default=fast_start): bool,
+                    vol.Required(CONF_COALESCE_WRITES, default=coalesce_writes): bool,
+                    vol.Required(CONF_COALESCE_DELAY, default=coalesce_delay): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=1000)
+                    ),
+                    vol.Required(CONF_REPORT_WINDOW, default=report_window): vol.All(
+                        vol.Coerce(int), vol.Range(min=0, max=5000)
+                    ),
+                    vol.Required(
+                        CONF_BULK_CONCURRENCY, default=bulk_concurrency
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=64)),
+                    vol.Required(
+                        CONF_UNAVAILABLE_GRACE, default=unavailable_grace
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=600)),
+                    vol.Optional(CONF_DEBUG_SAMPLING, default=debug_sampling): str,
+                    vol.Optional(CONF_DEBUG_EIDS, default=debug_eids): str,
                 }
             ),
         )
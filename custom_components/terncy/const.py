@@ -48,9 +48,32 @@ PROFILE_PRESENCE_SENSOR = 43
 CONF_DEVID = "dev_id"
 CONF_NAME = "dn"
 CONF_IP = "ip"
+CONF_IPS = "ips"  # 所有广播的地址
+CONF_IP_FAMILY = "ip_family"  # 上次连接成功的地址族，4 或 6
 
 CONF_EXPORT_DEVICE_GROUPS = "export_device_groups"
 CONF_EXPORT_SCENES = "export_scenes"
+CONF_FAST_START = "fast_start"
+CONF_COALESCE_WRITES = "coalesce_state_writes"
+CONF_COALESCE_DELAY = "coalesce_state_writes_delay"  # ms, 0: 下一次事件循环
+
+CONF_REPORT_WINDOW = "report_window"  # ms, 0: 不合并 report
+CONF_BULK_CONCURRENCY = "bulk_concurrency"  # 批量命令同时在途的 eid 数
+CONF_UNAVAILABLE_GRACE = "unavailable_grace"  # 秒，断线多久后才把实体设为不可用
+CONF_DEBUG_SAMPLING = "debug_sampling"  # 如 "report=10"，每10条 report 打印1条
+CONF_DEBUG_EIDS = "debug_eids"  # 逗号分隔，只打印这些 eid/did 的调试日志
+
+DEFAULT_COALESCE_DELAY = 0
+DEFAULT_REPORT_WINDOW = 0
+DEFAULT_BULK_CONCURRENCY = 8
+DEFAULT_UNAVAILABLE_GRACE = 0
+
+SERVICE_SET_ATTRIBUTES_BULK = "set_attributes_bulk"
+
+# 这些属性表示一次性的动作，合并 report 时不能丢掉中间值，要立即送出
+UNBUFFERED_ATTRS = frozenset(
+    {"motion", "motionL", "motionR", "iasZoneStatus", "presenceStatus", "lockState"}
+)
 
 ACTION_SINGLE_PRESS = "single_press"
 ACTION_DOUBLE_PRESS = "double_press"
@@ -6,6 +6,7 @@ from homeassistant.core import CALLBACK_TYPE, callback
 from ..const import DEVICE_TRIGGER_ACTIONS_MAP, DOMAIN
 from ..hass.entity import TerncyEntity
 from ..types import AttrValue
+from ..utils import attrs_to_map
 
 
 class TerncyDevice:
@@ -36,8 +37,9 @@ class TerncyDevice:
             entity.set_available(available)
 
     def update_state(self, attributes: list[AttrValue]):
+        attrs = attrs_to_map(attributes)
         for entity in self.entities:
-            entity.update_state(attributes)
+            entity.update_state(attrs)
 
     def get_triggers(self, device_id: str) -> list[dict[str, str]]:
         if actions := DEVICE_TRIGGER_ACTIONS_MAP.get(self.profile):
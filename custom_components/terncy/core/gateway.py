@@ -1,7 +1,11 @@
 import asyncio
 import logging
-from collections.abc import Callable, Coroutine
-from typing import ForwardRef
+import random
+import time
+from collections import deque
+from collections.abc import Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from typing import Any, ForwardRef
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
@@ -14,7 +18,7 @@ from homeassistant.const import (
     MAJOR_VERSION,
     MINOR_VERSION,
 )
-from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, Context, Event, HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.device_registry import (
     CONNECTION_NETWORK_MAC,
@@ -27,6 +31,7 @@ if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 9):
 else:
     from homeassistant.helpers.entity import DeviceInfo
 
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import UNDEFINED
 from terncy import Terncy
 from terncy.event import Connected, Disconnected, EventMessage
@@ -37,11 +42,25 @@ from ..const import (
     ACTION_PRESSED,
     ACTION_ROTATION,
     ACTION_SINGLE_PRESS,
+    CONF_BULK_CONCURRENCY,
+    CONF_COALESCE_DELAY,
+    CONF_COALESCE_WRITES,
+    CONF_DEBUG_EIDS,
+    CONF_DEBUG_SAMPLING,
     CONF_DEVID,
     CONF_EXPORT_DEVICE_GROUPS,
     CONF_EXPORT_SCENES,
+    CONF_FAST_START,
     CONF_IP,
+    CONF_IPS,
+    CONF_IP_FAMILY,
+    CONF_REPORT_WINDOW,
+    CONF_UNAVAILABLE_GRACE,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_COALESCE_DELAY,
+    DEFAULT_REPORT_WINDOW,
     DEFAULT_ROOMS,
+    DEFAULT_UNAVAILABLE_GRACE,
     DOMAIN,
     EVENT_DATA_CLICK_TIMES,
     EVENT_DATA_SOURCE,
@@ -49,15 +68,18 @@ from ..const import (
     HA_CLIENT_ID,
     TERNCY_EVENT_SVC_ADD,
     TERNCY_EVENT_SVC_REMOVE,
+    TERNCY_EVENT_SVC_UPDATE,
     TERNCY_HUB_ID_PREFIX,
     TERNCY_MANU_NAME,
+    UNBUFFERED_ATTRS,
 )
-from ..hass.add_entities import create_entity, ha_add_entity
+from ..hass.add_entities import create_entity, ha_add_entities
 from ..hass.entity import TerncyEntity
 from ..hass.entity_descriptions import TerncyEntityDescription, TerncySwitchDescription
 from ..hub_monitor import TerncyHubManager
-from ..profiles import PROFILES
+from ..profiles import PROFILES, get_descriptions
 from ..types import (
+    AttrMap,
     AttrValue,
     DeviceGroupData,
     EntityAvailableMsgData,
@@ -71,6 +93,15 @@ from ..types import (
     SimpleMsgData,
     SvcData,
 )
+from ..utils import (
+    LatencyWindow,
+    async_race_connect,
+    attrs_to_map,
+    ip_family,
+    parse_debug_eids,
+    parse_debug_sampling,
+    url_host,
+)
 
 SetupHandler = Callable[
     [
@@ -83,6 +114,32 @@ SetupHandler = Callable[
     list[TerncyEntity],
 ]
 
+EventHandler = Callable[[list], None]
+
+SNAPSHOT_STORAGE_VERSION = 1
+
+RECONNECT_INITIAL_DELAY = 2  # 秒，每次连不上翻倍
+RECONNECT_MAX_DELAY = 300
+MAX_CONCURRENT_CONNECTS = 2  # 所有网关同时进行的连接数
+
+COMMAND_ACK_TIMEOUT = 2  # 秒，等 hub 确认命令后再发同一 eid 的下一条
+
+CONFIRM_TIMEOUT = 30  # 秒，超过这个时间还没收到对应的 report 就不再等了
+
+INGRESS_QUEUE_SIZE = 256  # 超过后 report 合并，其他事件照样排队
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Storage of the last fetched hub topology of a config entry."""
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+def connect_slots(hass: HomeAssistant) -> asyncio.Semaphore:
+    """Limit of connection attempts in progress, shared by all gateways."""
+    return hass.data.setdefault(
+        f"{DOMAIN}_connect_slots", asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+    )
+
 
 class TerncyGateway:
     """Represents a Terncy Gateway."""
@@ -92,11 +149,112 @@ class TerncyGateway:
         self.config_entry = config_entry
 
         self._stopped = False
+        self._fast_starting = False  # 正在连接上次的地址，还没用自动发现的地址
+        self._racing = False  # 正在从多个地址中挑选能连上的
+        self._start_time: float | None = None  # 用于统计启动到首次连上的耗时
+        self.reconnects = 0  # 断线后重连的次数
+        self.connect_attempts = 0
+        self.connect_failures = 0  # 没连上就断开的尝试
+        self.reconnect_delay = RECONNECT_INITIAL_DELAY
+        self._attempt_connected = True  # 本次尝试是否连上过
+        # 本次连接尝试释放连接名额的函数，不为 None 表示有尝试在进行
+        self._connect_release: Callable[[], None] | None = None
+        self._reconnect_pending = False  # 正在等待重连
+        self._unavailable_handle: asyncio.TimerHandle | None = None  # 断线宽限期
+        self.disconnects_absorbed = 0  # 在宽限期内重连上、没有设为不可用的断线
 
         self.parsed_devices: dict[str, TerncyDevice] = {}  # key: eid
-        self._listeners: dict[str, set[Callable[[list[AttrValue]], None]]] = {}
+        self._did_eids: dict[str, set[str]] = {}  # did: eids，按物理设备查找用
+        self._device_ids: dict[str, str] = {}  # eid: HA device_id，按键事件用
+        self._listeners: dict[str, set[Callable[[AttrMap], None]]] = {}
         self.room_data: dict[str, str] = {}  # room_id: room_name
         self.scenes: dict[str, TerncyEntity] = {}  # 场景实体们
+        # eid: {attr: (value, timestamp)}，最后一次收到的属性值
+        self._states: dict[str, dict[str, tuple[int, float]]] = {}
+
+        # 上次刷新拿到的拓扑，HA启动时先用它创建实体
+        self._snapshot_store = snapshot_store(hass, config_entry.entry_id)
+        self._restored_eids: set[str] = set()
+        self._restored_scenes: set[str] = set()
+
+        # region report 合并
+        self._report_buffer: dict[str, AttrMap] = {}  # eid: 窗口内合并后的属性
+        self._report_flush_handle: asyncio.TimerHandle | None = None
+        self.reports_received = 0  # 收到的 report (按 eid 计)
+        self.reports_merged = 0  # 合并进已有缓冲的 report
+        self.reports_delivered = 0  # 送给实体的 report
+        # endregion
+
+        # region 事件队列
+        self._ingress: deque[tuple[str, list, float]] = deque()  # 类型, 数据, 入队时间
+        self._ingress_wakeup = asyncio.Event()
+        self._ingress_task: asyncio.Task | None = None
+        self._ingress_merged: dict[str, AttrMap] | None = None  # 队尾的合并 report
+        self._ingress_overloaded = False
+        self.ingress_max_depth = 0  # 队列最大长度
+        self.ingress_lag = 0.0  # 最近一条消息的排队耗时(秒)
+        self.ingress_max_lag = 0.0
+        self.ingress_merged = 0  # 队列满时被合并的 report 消息
+        self.ingress_overflow = 0  # 队列满时照样排队的消息
+        # endregion
+
+        # region 命令合并
+        # eid: {attr: (value, method)}，等前一条命令确认后再发，新值覆盖旧值
+        self._outbox: dict[str, dict[str, tuple[Any, int]]] = {}
+        self._sending: set[str] = set()  # 有命令在途的 eid
+        # eid: 值在 _outbox 里等待发送的调用者
+        self._outbox_waiters: dict[str, list[asyncio.Future]] = {}
+        self.commands_sent = 0
+        self.commands_coalesced = 0  # 还没发出就被新值覆盖的属性
+        # endregion
+
+        # region 命令延迟
+        self.ack_latency = LatencyWindow()  # 发出命令到 hub 确认
+        self.confirm_latency = LatencyWindow()  # 发出命令到收到相同值的 report
+        self.commands_unacked = 0  # 超时或断线没有确认的命令
+        # eid: {attr: (value, 发出时间)}，等 report 确认的命令
+        self._awaiting_confirm: dict[str, dict[str, tuple[Any, float]]] = {}
+        # endregion
+
+        # region 多目标合并
+        self._group_members: dict[str, list[str]] = {}  # 设备组 eid: deviceUuids
+        # (context id, 属性): {eid: future}，同一次服务调用里属性相同的命令
+        self._fan_out: dict[tuple, dict[str, asyncio.Future]] = {}
+        self.group_commands = 0  # 用设备组代替的多目标命令
+        self.burst_commands = 0  # 一起发出的多目标命令
+        # endregion
+
+        # 新实体先攒起来，按平台一次性添加
+        self._new_entities: list[TerncyEntity] = []
+        self._entity_batch_depth = 0
+
+        # region 增量刷新
+        self._device_meta: dict[str, tuple] = {}  # did: 上次写入设备注册表的信息
+        self._svc_meta: dict[str, tuple] = {}  # eid: 上次写入设备注册表的信息
+        self._refresh_stats: dict[str, int] = {}
+        # endregion
+
+        # region 事件分发
+        self._event_handlers: dict[str, EventHandler] = {}  # key: event type
+        self.event_counts: dict[str, int] = {}  # 每种事件收到的消息数
+        self.event_handle_time: dict[str, float] = {}  # 每种事件累计处理耗时(秒)
+        self.register_event_handler("report", self._on_report)
+        self.register_event_handler("keyPressed", self._on_key_pressed)
+        self.register_event_handler("keyLongPressed", self._on_key_long_pressed)
+        self.register_event_handler("rotation", self._on_rotation)
+        self.register_event_handler("entityAvailable", self._on_entity_available)
+        self.register_event_handler("entityDeleted", self._on_entity_deleted)
+        self.register_event_handler("entityCreated", self._on_entity_created)
+        self.register_event_handler("entityUpdated", self._on_entity_updated)
+        self.register_event_handler("offline", self._on_offline)
+        # endregion
+
+        # region 状态写入
+        self.suppressed_writes = 0  # 状态没变化而跳过的 async_write_ha_state 次数
+        self._dirty_entities: dict[str, TerncyEntity] = {}  # key: unique_id
+        self._flush_handle: asyncio.Handle | asyncio.TimerHandle | None = None
+        self.coalesced_writes = 0  # 被合并掉的写入次数
+        # endregion
 
         self.name = config_entry.title
         self.mac = format_mac(config_entry.unique_id.replace(TERNCY_HUB_ID_PREFIX, ""))
@@ -116,19 +274,51 @@ class TerncyGateway:
             CONF_EXPORT_DEVICE_GROUPS, True
         )
         self.export_scenes = config_entry.options.get(CONF_EXPORT_SCENES, False)
+        self.fast_start = config_entry.options.get(CONF_FAST_START, True)
+        self.coalesce_writes = False
+        self.coalesce_delay = DEFAULT_COALESCE_DELAY  # ms
+        self.report_window = DEFAULT_REPORT_WINDOW  # ms
+        self.bulk_concurrency = DEFAULT_BULK_CONCURRENCY
+        self.unavailable_grace = DEFAULT_UNAVAILABLE_GRACE  # s
+        self.debug_sampling: dict[str, int] = {}  # event type: 每 N 条打印1条
+        self.debug_eids: frozenset[str] = frozenset()  # 空表示不过滤
+        self._debug_seen: dict[str, int] = {}  # event type: 过滤后见到的条数
+        self.apply_options()
 
         # endregion
 
         async def on_hass_stop(event: Event):
             """Stop push updates when hass stops."""
             self.logger.debug("on_hass_stop")
-            await self.stop()
+            await self.stop(shutdown=True)
 
         hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, on_hass_stop)
 
+    def apply_options(self):
+        """Apply options that can change without reloading the entry."""
+        options = self.config_entry.options
+        self.coalesce_writes = options.get(CONF_COALESCE_WRITES, False)
+        self.coalesce_delay = options.get(CONF_COALESCE_DELAY, DEFAULT_COALESCE_DELAY)
+        self.report_window = options.get(CONF_REPORT_WINDOW, DEFAULT_REPORT_WINDOW)
+        self.bulk_concurrency = options.get(
+            CONF_BULK_CONCURRENCY, DEFAULT_BULK_CONCURRENCY
+        )
+        self.unavailable_grace = options.get(
+            CONF_UNAVAILABLE_GRACE, DEFAULT_UNAVAILABLE_GRACE
+        )
+        self.debug_sampling = parse_debug_sampling(
+            options.get(CONF_DEBUG_SAMPLING, "")
+        )
+        self.debug_eids = parse_debug_eids(options.get(CONF_DEBUG_EIDS, ""))
+        if not self.coalesce_writes:
+            self._flush_writes()
+        if self.report_window <= 0:
+            self._flush_reports()
+
     def start(self):
         tern = self.api
         self._stopped = False
+        self._start_time = time.monotonic()
 
         def on_terncy_svc_add(event: Event):
             """Terncy service found handler"""
@@ -143,12 +333,14 @@ class TerncyGateway:
                     "dev %s's ip address is not valid. %s", dev_id, event.data
                 )
                 return
+            if self._fast_starting:
+                self.logger.debug("Fast starting, connect to %s if it fails", ip)
+                return
             if not tern.is_connected():
-                tern.ip = ip
                 self.logger = logging.getLogger(f"{__name__}.{ip}")
                 self.logger.debug("Start connecting %s", dev_id)
                 self._stopped = False
-                self.async_create_background_task(self.api.start(), "Start")
+                self._connect_discovered(event.data)
 
         def on_terncy_svc_remove(event: Event):
             """Terncy service stop handler"""
@@ -159,34 +351,176 @@ class TerncyGateway:
             self.logger.debug("on_terncy_svc_remove %s", event.data[CONF_DEVID])
             self.async_create_task(self.stop())
 
-        self.hass.bus.async_listen(TERNCY_EVENT_SVC_ADD, on_terncy_svc_add)
-        self.hass.bus.async_listen(TERNCY_EVENT_SVC_REMOVE, on_terncy_svc_remove)
+        def on_terncy_svc_update(event: Event):
+            """Terncy service updated handler"""
+            if event.data[CONF_DEVID] == tern.dev_id and event.data[CONF_IP]:
+                # the hub moved if the last working address is not advertised
+                addresses = event.data.get(CONF_IPS) or [event.data[CONF_IP]]
+                if self.config_entry.data.get(CONF_HOST) not in addresses:
+                    self._save_host(event.data[CONF_IP])
+
+        bus = self.hass.bus
+        on_unload = self.config_entry.async_on_unload
+        on_unload(bus.async_listen(TERNCY_EVENT_SVC_ADD, on_terncy_svc_add))
+        on_unload(bus.async_listen(TERNCY_EVENT_SVC_REMOVE, on_terncy_svc_remove))
+        on_unload(bus.async_listen(TERNCY_EVENT_SVC_UPDATE, on_terncy_svc_update))
+
+        if self._ingress_task is None:
+            self._ingress_task = self.async_create_background_task(
+                self._async_drain_ingress(), "Ingress"
+            )
+            on_unload(self._ingress_task.cancel)
+        tern.register_event_handler(self.terncy_event_handler)
 
-        hub_manager = TerncyHubManager.instance(self.hass)
-        if (txt_records := hub_manager.hubs.get(tern.dev_id)) and not self.is_connected:
-            tern.ip = txt_records[CONF_IP]
-            self.logger.debug("Start connection to %s", tern.dev_id)
-            self.async_create_background_task(self.api.start(), "Start")
+        if not self._connect_discovered() and self.fast_start:
+            # don't wait for mDNS, the last address probably still works
+            self._fast_starting = True
+            tern.ip = url_host(self.config_entry.data[CONF_HOST])
+            self.logger.debug("Fast start connection to %s", tern.ip)
+            self.async_create_background_task(self._async_fast_start(), "Start")
 
-        tern.register_event_handler(self.terncy_event_handler)
+    async def _async_fast_start(self):
+        try:
+            await self._async_connect()
+        except Exception as e:
+            # terncy doesn't catch everything, e.g. another host on the old ip
+            self.logger.warning("Fast start to %s failed: %r", self.api.ip, e)
+        finally:
+            if self._fast_starting:
+                # no Connected/Disconnected came, don't ignore discovery forever
+                self._fast_starting = False
+                self._connect_discovered()
+
+    def _connect_discovered(self, txt_records: dict | None = None) -> bool:
+        """Connect to the address found by discovery, if any."""
+        if txt_records is None:
+            hub_manager = TerncyHubManager.instance(self.hass)
+            txt_records = hub_manager.hubs.get(self.api.dev_id)
+        if not txt_records or not txt_records[CONF_IP] or self.is_connected:
+            return False
+        if self._attempt_pending:
+            self.logger.debug("Connection attempt pending, ignore %s", txt_records)
+            return True
+        addresses = txt_records.get(CONF_IPS) or [txt_records[CONF_IP]]
+        self.logger.debug("Start connection to %s %s", self.api.dev_id, addresses)
+        self._racing = True
+        self.async_create_background_task(self._async_start(addresses), "Start")
+        return True
+
+    @property
+    def _attempt_pending(self) -> bool:
+        """A connection attempt or reconnect is under way, only one at a time."""
+        return (
+            self._racing or self._reconnect_pending or self._connect_release is not None
+        )
 
-    async def stop(self):
+    async def _async_start(self, addresses: list[str]):
+        """Race connections to all advertised addresses and start with the winner."""
+        # the family that worked last time goes first
+        preferred = self.config_entry.data.get(CONF_IP_FAMILY)
+        addresses = sorted(addresses, key=lambda addr: ip_family(addr) != preferred)
+        ip = addresses[0]
+        try:
+            if len(addresses) > 1:
+                if winner := await async_race_connect(addresses, self.api.port):
+                    ip = winner
+                    self.logger.debug("%s wins in %s", ip, addresses)
+        finally:
+            self._racing = False
+        if self.is_connected:
+            return
+        self._save_host(ip)
+        self.api.ip = url_host(ip)
+        await self._async_connect()
+
+    def _save_host(self, ip: str):
+        """Remember the address of the hub for the next fast start."""
+        data = self.config_entry.data
+        family = ip_family(ip)
+        if ip != data.get(CONF_HOST) or family != data.get(CONF_IP_FAMILY):
+            self.hass.config_entries.async_update_entry(
+                self.config_entry,
+                data={**data, CONF_HOST: ip, CONF_IP_FAMILY: family},
+            )
+
+    async def stop(self, shutdown: bool = False):
         self._stopped = True
+        if self._unavailable_handle is not None:
+            self._cancel_unavailable()
+            if not shutdown:
+                # no reconnect will follow, don't leave stale states available
+                self._mark_unavailable()
+        self._flush_reports()
+        self._flush_writes()
         await self.api.stop()
 
     async def reconnect(self):
-        """Terncy service retry connection handler"""
+        """Terncy service retry connection handler, with capped exponential backoff"""
         if self._stopped:
             self.logger.debug("service stopped, don't retry")
             return
+        if self._attempt_pending:
+            self.logger.debug("Connection attempt pending, don't retry")
+            return
 
-        await asyncio.sleep(2)
+        delay = self.reconnect_delay
+        self.reconnect_delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        self._reconnect_pending = True
+        try:
+            # jitter, so hubs that went down together don't retry in lockstep
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+        finally:
+            self._reconnect_pending = False
+        if self._stopped or self._attempt_pending:
+            return
         if self.is_connected:
             self.logger.warning("service is still connected while retry")
             return
 
         self.logger.warning("Start reconnecting...")
-        await self.api.start()
+        self.reconnects += 1
+        await self._async_connect()
+
+    async def _async_connect(self):
+        """Run the connection, waiting for a free slot to attempt it.
+
+        The slot is held until Connected/Disconnected ends the attempt.
+        """
+        if self._connect_release is not None:
+            self.logger.debug("Connection attempt pending, don't start another")
+            return
+        slots = connect_slots(self.hass)
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                slots.release()
+            if self._connect_release is release:
+                self._connect_release = None
+
+        self._connect_release = release
+        try:
+            await slots.acquire()
+        except BaseException:
+            released = True  # never acquired
+            release()
+            raise
+        if self._stopped:
+            # stopped or unloaded while waiting for the slot
+            release()
+            return
+        self._attempt_connected = False
+        self.connect_attempts += 1
+        try:
+            await self.api.start()  # until disconnected
+        finally:
+            release()
+
+    def _end_connect_attempt(self):
+        if self._connect_release is not None:
+            self._connect_release()
 
     @property
     def unique_id(self):
@@ -196,8 +530,11 @@ class TerncyGateway:
     def is_connected(self):
         return self.api.is_connected()
 
+    def listener_count(self, eid: str) -> int:
+        return len(self._listeners.get(eid, ()))
+
     def add_listener(
-        self, eid: str, listener: Callable[[list[AttrValue]], None]
+        self, eid: str, listener: Callable[[AttrMap], None]
     ) -> CALLBACK_TYPE:
         @callback
         def remove_listener() -> None:
@@ -212,22 +549,275 @@ class TerncyGateway:
 
     def update_listeners(self, eid: str, data: list[AttrValue]):
         # self.logger.debug("STATE: %s <= %s", eid, data)
-        if eid in self._listeners:
-            for listener in self._listeners[eid]:
-                listener(data)
+        self._update_listeners(eid, attrs_to_map(data))
+
+    def _update_listeners(self, eid: str, attrs: AttrMap):
+        self._cache_states(eid, attrs)
+        if listeners := self._listeners.get(eid):
+            for listener in listeners:
+                listener(attrs)
         # else:
         #     self.logger.debug("no listener for %s", eid)
 
-    async def set_attribute(self, eid: str, attr: str, value, method=0):
-        await self.api.set_attribute(eid, attr, value, method)
-        self.update_listeners(eid, [{"attr": attr, "value": value}])
+    def _cache_states(self, eid: str, attrs: AttrMap):
+        now = time.time()
+        states = self._states.setdefault(eid, {})
+        for attr, value in attrs.items():
+            states[attr] = (value, now)
+
+    def get_state(self, eid: str, attr: str) -> int | None:
+        """Last known value of an attribute."""
+        if state := self._states.get(eid, {}).get(attr):
+            return state[0]
+        return None
+
+    def get_state_time(self, eid: str, attr: str) -> float | None:
+        """When the last known value of an attribute was received (unix time)."""
+        if state := self._states.get(eid, {}).get(attr):
+            return state[1]
+        return None
+
+    def get_states(self, eid: str) -> AttrMap:
+        """Last known values of all attributes of eid."""
+        return {attr: state[0] for attr, state in self._states.get(eid, {}).items()}
+
+    async def set_attribute(self, eid: str, attr: str, value, method=0) -> bool:
+        return await self.set_attributes(
+            eid, [{"attr": attr, "value": value}], method
+        )
 
-    async def set_attributes(self, eid: str, attrs: list[AttrValue], method=0):
-        await self.api.set_attributes(eid, attrs, method)
+    async def set_attributes(
+        self, eid: str, attrs: list[AttrValue], method=0
+    ) -> bool:
+        """Set attributes of eid, False if the hub didn't acknowledge."""
+        pending = self._outbox.setdefault(eid, {})
+        for av in attrs:
+            if av["attr"] in pending:
+                self.commands_coalesced += 1
+            pending[av["attr"]] = (av["value"], method)
+        self._discard_buffered_reports(eid, [av["attr"] for av in attrs])
         self.update_listeners(eid, attrs)
+        if eid in self._sending:
+            # the sender of eid picks up the latest values when it's free,
+            # wait for the command that carries them
+            waiter = self.hass.loop.create_future()
+            self._outbox_waiters.setdefault(eid, []).append(waiter)
+            return await waiter
+
+        own_acked: bool | None = None  # the first batch carries our own values
+        self._sending.add(eid)
+        try:
+            while pending := self._outbox.pop(eid, None):
+                waiters = self._outbox_waiters.pop(eid, [])
+                acked = False
+                try:
+                    acked = await self._send_attributes(eid, pending)
+                finally:
+                    self._resolve_waiters(waiters, acked)
+                if own_acked is None:
+                    own_acked = acked
+        finally:
+            self._sending.discard(eid)
+            self._outbox.pop(eid, None)
+            self._resolve_waiters(self._outbox_waiters.pop(eid, []), False)
+        return bool(own_acked)
+
+    @staticmethod
+    def _resolve_waiters(waiters: list[asyncio.Future], acked: bool):
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(acked)
+
+    async def _send_attributes(
+        self, eid: str, pending: dict[str, tuple[Any, int]]
+    ) -> bool:
+        """Send the pending attributes of eid and wait for the hub to ack."""
+        by_method: dict[int, list[AttrValue]] = {}
+        for attr, (value, method) in pending.items():
+            by_method.setdefault(method, []).append({"attr": attr, "value": value})
+        acked = True
+        awaiting = self._awaiting_confirm.setdefault(eid, {})
+        for method, attrs in by_method.items():
+            self.commands_sent += 1
+            start = time.monotonic()
+            for av in attrs:
+                awaiting[av["attr"]] = (av["value"], start)
+            if len(attrs) == 1:
+                resp = await self.api.set_attribute(
+                    eid,
+                    attrs[0]["attr"],
+                    attrs[0]["value"],
+                    method,
+                    wait_result=True,
+                    timeout=COMMAND_ACK_TIMEOUT,
+                )
+            else:
+                resp = await self.api.set_attributes(
+                    eid, attrs, method, wait_result=True, timeout=COMMAND_ACK_TIMEOUT
+                )
+            if resp and "rsp" in resp:
+                self.ack_latency.add((time.monotonic() - start) * 1000)
+            else:
+                self.commands_unacked += 1
+                acked = False
+        return acked
+
+    def _confirm_commands(self, eid: str, attributes: list[AttrValue]):
+        """Match a report with the commands waiting for it."""
+        if not (awaiting := self._awaiting_confirm.get(eid)):
+            return
+        now = time.monotonic()
+        for av in attributes:
+            if (command := awaiting.get(av.get("attr"))) is None:
+                continue
+            value, sent = command
+            if now - sent > CONFIRM_TIMEOUT:
+                del awaiting[av["attr"]]
+            elif value == av.get("value"):
+                self.confirm_latency.add((now - sent) * 1000)
+                del awaiting[av["attr"]]
+        if not awaiting:
+            del self._awaiting_confirm[eid]
+
+    async def async_set_attributes_bulk(
+        self,
+        commands: list[tuple[str, list[AttrValue]]],
+        method=0,
+        concurrency: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Set attributes of many eids, at most `concurrency` of them in flight.
+
+        Returns {eid: {"success": bool, "duration": ms, "error": str}}.
+        """
+        merged: dict[str, dict[str, Any]] = {}  # eid: {attr: value}
+        for eid, attrs in commands:
+            for av in attrs:
+                merged.setdefault(eid, {})[av["attr"]] = av["value"]
+
+        semaphore = asyncio.Semaphore(concurrency or self.bulk_concurrency)
+        results: dict[str, dict[str, Any]] = {}
+
+        async def run(eid: str, attrs: dict[str, Any]):
+            attr_values = [
+                {"attr": attr, "value": value} for attr, value in attrs.items()
+            ]
+            async with semaphore:
+                start = time.monotonic()
+                error = None
+                try:
+                    if not await self.set_attributes(eid, attr_values, method):
+                        error = "not acknowledged"
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                result = {
+                    "success": error is None,
+                    "duration": round((time.monotonic() - start) * 1000, 1),
+                }
+                if error:
+                    result["error"] = error
+                results[eid] = result
+
+        await asyncio.gather(*(run(eid, attrs) for eid, attrs in merged.items()))
+        failed = sum(1 for result in results.values() if not result["success"])
+        self.logger.debug("Bulk command to %d eids, %d failed", len(results), failed)
+        return results
+
+    async def fan_out_attributes(
+        self, context: Context | None, eid: str, attrs: list[AttrValue]
+    ) -> bool:
+        """Set attributes of eid as part of a possibly multi-target service call.
+
+        Calls with the same context and attributes in one loop iteration are
+        sent together, as hub device group commands where the targets match.
+        The number of targets is unknown here, so a single-target call waits
+        one iteration too and is sent as a batch of one.
+        """
+        if context is None:
+            return await self.set_attributes(eid, attrs)
+        key = (context.id, tuple((av["attr"], av["value"]) for av in attrs))
+        if (batch := self._fan_out.get(key)) is None:
+            batch = self._fan_out[key] = {}
+            self.hass.loop.call_soon(self._flush_fan_out, key, attrs)
+        future = batch[eid] = self.hass.loop.create_future()
+        return await future
+
+    @callback
+    def _flush_fan_out(self, key: tuple, attrs: list[AttrValue]):
+        batch = self._fan_out.pop(key)
+        self.async_create_task(self._async_send_fan_out(batch, attrs))
+
+    async def _async_send_fan_out(
+        self, batch: dict[str, asyncio.Future], attrs: list[AttrValue]
+    ):
+        targets: dict[str, list[str]] = {}  # eid to send to: eids it covers
+        remaining = set(batch)
+        if len(remaining) > 1:
+            for group_eid, members in self._group_targets():
+                if members <= remaining:
+                    targets[group_eid] = list(members)
+                    remaining -= members
+        self.group_commands += len(targets)
+        targets.update({eid: [eid] for eid in remaining})
+        if len(targets) > 1:
+            self.burst_commands += len(targets)
+
+        results = await asyncio.gather(
+            *(self.set_attributes(eid, attrs) for eid in targets),
+            return_exceptions=True,
+        )
+        attr_names = [av["attr"] for av in attrs]
+        for (eid, covered), result in zip(targets.items(), results):
+            if covered != [eid]:
+                # the group's members report on their own, be optimistic meanwhile
+                for member in covered:
+                    self._discard_buffered_reports(member, attr_names)
+                    self.update_listeners(member, attrs)
+            for member in covered:
+                future = batch[member]
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _group_targets(self) -> list[tuple[str, set[str]]]:
+        """Exported device groups and their member eids, the largest first."""
+        groups = []
+        for group_eid, uuids in self._group_members.items():
+            device = self.parsed_devices.get(group_eid)
+            if device is None or not any(e.available for e in device.entities):
+                continue
+            if (members := self._resolve_group_members(uuids)) and len(members) > 1:
+                groups.append((group_eid, members))
+        groups.sort(key=lambda group: len(group[1]), reverse=True)
+        return groups
+
+    def _resolve_group_members(self, uuids: list[str]) -> set[str] | None:
+        """Member eids of a device group, None if any member is unknown.
+
+        A group command switches every member on the hub side, so a group can
+        only replace commands to exactly its members.
+        """
+        members: set[str] = set()
+        for uuid in uuids:
+            if uuid in self.parsed_devices:
+                members.add(uuid)
+            elif len(eids := self._did_eids.get(uuid, ())) == 1:
+                members.update(eids)
+            else:
+                # not parsed (yet), unsupported, or a did of several services
+                return None
+        return members
 
     # region Event handlers
 
+    def register_event_handler(self, event_type: str, handler: EventHandler):
+        """Register the handler of a terncy event type, replacing the old one."""
+        self._event_handlers[event_type] = handler
+        self.event_counts.setdefault(event_type, 0)
+        self.event_handle_time.setdefault(event_type, 0.0)
+
     def terncy_event_handler(self, api: Terncy, event):
         """Handle event from terncy system."""
 
@@ -240,24 +830,8 @@ class TerncyGateway:
 
             msg_data = msg.get("entities", [])
             event_type = msg.get("type")
-            if event_type == "report":
-                self._on_report(msg_data)
-            elif event_type == "keyPressed":
-                self._on_key_pressed(msg_data)
-            elif event_type == "keyLongPressed":
-                self._on_key_long_pressed(msg_data)
-            elif event_type == "rotation":
-                self._on_rotation(msg_data)
-            elif event_type == "entityAvailable":
-                self._on_entity_available(msg_data)
-            elif event_type == "entityDeleted":
-                self._on_entity_deleted(msg_data)
-            elif event_type == "entityCreated":
-                self._on_entity_created(msg_data)
-            elif event_type == "entityUpdated":
-                self._on_entity_updated(msg_data)
-            elif event_type == "offline":
-                self._on_offline(msg_data)
+            if event_type in self._event_handlers:
+                self._enqueue(event_type, msg_data)
             elif event_type is None:
                 self.logger.debug("event type is None, ignore. %s", msg)
             else:
@@ -269,28 +843,231 @@ class TerncyGateway:
 
         elif isinstance(event, Connected):
             self.logger.info("Connected: %s", self.unique_id)
+            if self._start_time is not None:
+                self.logger.info(
+                    "First connected %.2fs after start (%s)",
+                    time.monotonic() - self._start_time,
+                    "fast start" if self._fast_starting else "discovery",
+                )
+                self._start_time = None
+            self._fast_starting = False
+            self._attempt_connected = True
+            self.reconnect_delay = RECONNECT_INITIAL_DELAY
+            self._end_connect_attempt()
+            if self._unavailable_handle is not None:
+                self.disconnects_absorbed += 1
+                self._cancel_unavailable()
             self.async_create_task(self.async_refresh_devices())
 
         elif isinstance(event, Disconnected):
             self.logger.warning("Disconnected: %s", self.unique_id)
-            for device in self.parsed_devices.values():
-                device.set_available(False)
-            if not self._stopped:
+            if not self._attempt_connected:
+                self.connect_failures += 1
+                self._attempt_connected = True
+            self._end_connect_attempt()
+            if self.unavailable_grace <= 0:
+                self._mark_unavailable()
+            elif self._unavailable_handle is None:
+                self._unavailable_handle = self.hass.loop.call_later(
+                    self.unavailable_grace, self._on_grace_expired
+                )
+            if self._fast_starting:
+                self._fast_starting = False
+                self.logger.warning(
+                    "Fast start to %s failed, wait for discovery", self.api.ip
+                )
+                self._connect_discovered()
+            elif not self._stopped and not self._attempt_pending:
                 self.async_create_background_task(self.reconnect(), "Reconnect")
 
         else:
             self.logger.warning("Unknown Event: %s", event)
 
+    @property
+    def ingress_depth(self) -> int:
+        return len(self._ingress)
+
+    def _enqueue(self, event_type: str, msg_data: list):
+        """Queue a message for the consumer task, the socket reader never waits."""
+        ingress = self._ingress
+        if len(ingress) >= INGRESS_QUEUE_SIZE:
+            if not self._ingress_overloaded:
+                self._ingress_overloaded = True
+                self.logger.warning(
+                    "Falling behind, %d messages queued, lag %.2fs",
+                    len(ingress),
+                    time.monotonic() - ingress[0][2],
+                )
+            if event_type == "report" and self._merge_report(msg_data):
+                self.ingress_merged += 1
+                return
+            # never drop anything else, events and entity changes are not idempotent
+            self.ingress_overflow += 1
+
+        ingress.append((event_type, msg_data, time.monotonic()))
+        self.ingress_max_depth = max(self.ingress_max_depth, len(ingress))
+        self._ingress_wakeup.set()
+
+    def _merge_report(self, msg_data: ReportMsgData) -> bool:
+        """Merge an overflowing report into the queue tail, the latest value wins."""
+        for id_attributes in msg_data:
+            for av in id_attributes.get("attributes", []):
+                if av["attr"] in UNBUFFERED_ATTRS:
+                    return False  # every transition counts
+        merged = self._ingress_merged
+        if merged is None or self._ingress[-1][1] is not merged:
+            # only merge at the tail, so reports never overtake other events
+            merged = self._ingress_merged = {}
+            self._ingress.append(("report", merged, time.monotonic()))
+            self.ingress_max_depth = max(self.ingress_max_depth, len(self._ingress))
+            self._ingress_wakeup.set()
+        for id_attributes in msg_data:
+            attrs = merged.setdefault(id_attributes.get("id"), {})
+            for av in id_attributes.get("attributes", []):
+                attrs[av["attr"]] = av["value"]
+        return True
+
+    async def _async_drain_ingress(self):
+        """Consumer of the ingress queue."""
+        ingress = self._ingress
+        while True:
+            await self._ingress_wakeup.wait()
+            self._ingress_wakeup.clear()
+            while ingress:
+                event_type, msg_data, queued_at = ingress.popleft()
+                if msg_data is self._ingress_merged:
+                    self._ingress_merged = None
+                if isinstance(msg_data, dict):
+                    msg_data = [
+                        {
+                            "id": eid,
+                            "attributes": [
+                                {"attr": attr, "value": value}
+                                for attr, value in attrs.items()
+                            ],
+                        }
+                        for eid, attrs in msg_data.items()
+                    ]
+                self.ingress_lag = time.monotonic() - queued_at
+                self.ingress_max_lag = max(self.ingress_max_lag, self.ingress_lag)
+                self._dispatch_event(event_type, msg_data)
+                # let the socket reader run between messages
+                await asyncio.sleep(0)
+            if self._ingress_overloaded:
+                self._ingress_overloaded = False
+                self.logger.info(
+                    "Caught up, %d reports merged so far", self.ingress_merged
+                )
+
+    def _dispatch_event(self, event_type: str, msg_data: list):
+        handler = self._event_handlers.get(event_type)
+        if handler is None:
+            return
+        start = time.perf_counter()
+        try:
+            handler(msg_data)
+        except Exception:
+            self.logger.exception("Error handling %s: %s", event_type, msg_data)
+        finally:
+            self.event_counts[event_type] += 1
+            self.event_handle_time[event_type] += time.perf_counter() - start
+
+    def _debug_enabled(self, *eids: str) -> bool:
+        """Debug logging is on and passes the eid filter."""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return False
+        return not self.debug_eids or not self.debug_eids.isdisjoint(eids)
+
+    def _log_event(self, event_type: str, msg_data: list):
+        """Debug log a message, filtered by eid and sampled per event type."""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.debug_eids:
+            eids = self.debug_eids
+            msg_data = [item for item in msg_data if item.get("id") in eids]
+            if not msg_data:
+                return
+        if (rate := self.debug_sampling.get(event_type, 1)) > 1:
+            seen = self._debug_seen.get(event_type, 0) + 1
+            self._debug_seen[event_type] = seen
+            if seen % rate != 1:
+                return
+        self.logger.debug("EVENT: %s: %s", event_type, msg_data)
+
+    @callback
+    def _on_grace_expired(self):
+        self._unavailable_handle = None
+        if not self.is_connected:
+            self._mark_unavailable()
+
+    @callback
+    def _mark_unavailable(self):
+        """Mark all devices unavailable, with one batch of state writes."""
+        for device in self.parsed_devices.values():
+            for entity in device.entities:
+                entity._attr_available = False
+                if entity.hass:
+                    self.schedule_write(entity)
+        self._flush_writes()
+
+    def _cancel_unavailable(self):
+        if self._unavailable_handle is not None:
+            self._unavailable_handle.cancel()
+            self._unavailable_handle = None
+
     def _on_report(self, msg_data: ReportMsgData):
-        self.logger.debug("EVENT: report: %s", msg_data)
+        self._log_event("report", msg_data)
         for id_attributes in msg_data:
             eid = id_attributes.get("id")
             attributes = id_attributes.get("attributes", [])
-            self.update_listeners(eid, attributes)
+            self.reports_received += 1
+            self._confirm_commands(eid, attributes)
+            if self.report_window > 0:
+                self._buffer_report(eid, attributes)
+            else:
+                self.reports_delivered += 1
+                self.update_listeners(eid, attributes)
+
+    def _buffer_report(self, eid: str, attributes: list[AttrValue]):
+        """Merge the report into the buffer of eid, the latest value wins."""
+        immediate: AttrMap = {}
+        buffered = self._report_buffer.get(eid)
+        if buffered is not None:
+            self.reports_merged += 1
+        for av in attributes:
+            if av["attr"] in UNBUFFERED_ATTRS:
+                immediate[av["attr"]] = av["value"]
+            else:
+                if buffered is None:
+                    buffered = self._report_buffer[eid] = {}
+                buffered[av["attr"]] = av["value"]
+        if immediate:
+            self.reports_delivered += 1
+            self._update_listeners(eid, immediate)
+        if self._report_buffer and self._report_flush_handle is None:
+            self._report_flush_handle = self.hass.loop.call_later(
+                self.report_window / 1000, self._flush_reports
+            )
+
+    def _discard_buffered_reports(self, eid: str, attrs: list[str]):
+        """A command is newer than the buffered reports of its attributes."""
+        if buffered := self._report_buffer.get(eid):
+            for attr in attrs:
+                buffered.pop(attr, None)
+
+    @callback
+    def _flush_reports(self):
+        if self._report_flush_handle is not None:
+            self._report_flush_handle.cancel()
+            self._report_flush_handle = None
+        report_buffer, self._report_buffer = self._report_buffer, {}
+        for eid, attrs in report_buffer.items():
+            if attrs:
+                self.reports_delivered += 1
+                self._update_listeners(eid, attrs)
 
     def _on_key_pressed(self, msg_data: KeyPressedMsgData):
-        self.logger.debug("EVENT: keyPressed: %s", msg_data)
-        device_registry = dr.async_get(self.hass)
+        self._log_event("keyPressed", msg_data)
         for entity_data in msg_data:
             if "attributes" not in entity_data:
                 continue
@@ -303,56 +1080,51 @@ class TerncyGateway:
                 event_type = ACTION_SINGLE_PRESS
             if device := self.parsed_devices.get(eid):
                 device.trigger_event(event_type, {EVENT_DATA_CLICK_TIMES: times})
-            if device_entry := device_registry.async_get_device(
-                identifiers={(DOMAIN, eid)}
-            ):
-                self.hass.bus.async_fire(
-                    f"{DOMAIN}_{ACTION_PRESSED}",
-                    {
-                        CONF_DEVICE_ID: device_entry.id,
-                        EVENT_DATA_SOURCE: eid,
-                        EVENT_DATA_CLICK_TIMES: times,
-                    },
-                )
+            self._fire_button_event(
+                ACTION_PRESSED, eid, {EVENT_DATA_CLICK_TIMES: times}
+            )
 
     def _on_key_long_pressed(self, msg_data: SimpleMsgData):
-        self.logger.debug("EVENT: keyLongPressed: %s", msg_data)
-        device_registry = dr.async_get(self.hass)
+        self._log_event("keyLongPressed", msg_data)
         for item in msg_data:
             eid = item["id"]
             if device := self.parsed_devices.get(eid):
                 device.trigger_event(ACTION_LONG_PRESS)
-            if device_entry := device_registry.async_get_device(
-                identifiers={(DOMAIN, eid)}
-            ):
-                self.hass.bus.async_fire(
-                    f"{DOMAIN}_{ACTION_LONG_PRESS}",
-                    {
-                        CONF_DEVICE_ID: device_entry.id,
-                        EVENT_DATA_SOURCE: eid,
-                    },
-                )
+            self._fire_button_event(ACTION_LONG_PRESS, eid)
 
     def _on_rotation(self, msg_data: SimpleMsgData):
-        self.logger.debug("EVENT: rotation: %s", msg_data)
-        device_registry = dr.async_get(self.hass)
+        self._log_event("rotation", msg_data)
         for item in msg_data:
             eid = item["id"]
             if device := self.parsed_devices.get(eid):
                 device.trigger_event(ACTION_ROTATION)
-            if device_entry := device_registry.async_get_device(
-                identifiers={(DOMAIN, eid)}
-            ):
-                self.hass.bus.async_fire(
-                    f"{DOMAIN}_{ACTION_ROTATION}",
-                    {
-                        CONF_DEVICE_ID: device_entry.id,
-                        EVENT_DATA_SOURCE: eid,
-                    },
+            self._fire_button_event(ACTION_ROTATION, eid)
+
+    def forget_device_id(self, eid: str):
+        """Invalidate the cached HA device_id of eid."""
+        self._device_ids.pop(eid, None)
+
+    def _fire_button_event(
+        self, action: str, eid: str, extra_data: dict[str, Any] | None = None
+    ):
+        """Fire f"{DOMAIN}_{action}" on hass.bus for device triggers."""
+        if (device_id := self._device_ids.get(eid)) is None:
+            # not created by setup_device yet, maybe created in previous run
+            device_registry = dr.async_get(self.hass)
+            if not (
+                device_entry := device_registry.async_get_device(
+                    identifiers={(DOMAIN, eid)}
                 )
+            ):
+                return
+            device_id = self._device_ids[eid] = device_entry.id
+        self.hass.bus.async_fire(
+            f"{DOMAIN}_{action}",
+            {CONF_DEVICE_ID: device_id, EVENT_DATA_SOURCE: eid, **(extra_data or {})},
+        )
 
     def _on_entity_available(self, msg_data: EntityAvailableMsgData):
-        self.logger.debug("EVENT: entityAvailable: %s", msg_data)
+        self._log_event("entityAvailable", msg_data)
         for device_data in msg_data:
             if device_data["type"] == "device":
                 svc_list = device_data.get("services", [])
@@ -366,36 +1138,41 @@ class TerncyGateway:
                 )
 
     def _on_entity_deleted(self, msg_data: SimpleMsgData):
-        self.logger.debug("EVENT: entityDeleted: %s", msg_data)
-        device_registry = dr.async_get(self.hass)
+        self._log_event("entityDeleted", msg_data)
         for item in msg_data:
             did = item["id"]  # did or scene_id
             if did.startswith("scene-"):
-                if scene := self.scenes.get(did):
-                    scene.set_available(False)
-                    self.scenes.pop(did)
-                    er.async_get(self.hass).async_remove(scene.entity_id)
+                self._delete_scene(did)
             else:
-                will_delete: dict[str, TerncyDevice] = {
-                    eid: device
-                    for eid, device in self.parsed_devices.items()
-                    if did == device.did
-                }
-                for eid, device in will_delete.items():
-                    device.set_available(False)
-                    if device_entry := device_registry.async_get_device(
-                        identifiers={(DOMAIN, eid)}
-                    ):
-                        device_registry.async_remove_device(device_entry.id)
-                        self.logger.debug(
-                            "removed device_entry: %s %s",
-                            device_entry.id,
-                            device_entry.name,
-                        )
-                    self.parsed_devices.pop(eid)
+                for device in self.get_devices_by_did(did):
+                    self._delete_device(device.eid)
+
+    def _delete_scene(self, scene_id: str):
+        if scene := self.scenes.pop(scene_id, None):
+            scene.set_available(False)
+            er.async_get(self.hass).async_remove(scene.entity_id)
+
+    def _delete_device(self, eid: str):
+        if device := self.remove_device(eid):
+            device.set_available(False)
+        device_registry = dr.async_get(self.hass)
+        if device_entry := device_registry.async_get_device(
+            identifiers={(DOMAIN, eid)}
+        ):
+            device_registry.async_remove_device(device_entry.id)
+            self.logger.debug(
+                "removed device_entry: %s %s",
+                device_entry.id,
+                device_entry.name,
+            )
+        self.forget_device_id(eid)
+        self._svc_meta.pop(eid, None)
+        self._states.pop(eid, None)
+        self._group_members.pop(eid, None)
+        self._awaiting_confirm.pop(eid, None)
 
     def _on_entity_updated(self, msg_data: EntityUpdatedMsgData):
-        self.logger.debug("EVENT: entityUpdated: %s", msg_data)
+        self._log_event("entityUpdated", msg_data)
         for item in msg_data:
             if item["type"] == "scene":
                 self.setup_scene(item)
@@ -408,7 +1185,7 @@ class TerncyGateway:
                 )
 
     def _on_entity_created(self, msg_data: EntityCreatedMsgData):
-        self.logger.debug("EVENT: entityCreated: %s", msg_data)
+        self._log_event("entityCreated", msg_data)
         for item in msg_data:
             if item["type"] == "scene":
                 self.setup_scene(item)
@@ -421,12 +1198,10 @@ class TerncyGateway:
                 )
 
     def _on_offline(self, msg_data: SimpleMsgData):
-        self.logger.debug("EVENT: offline: %s", msg_data)
+        self._log_event("offline", msg_data)
         for device_data in msg_data:
-            did = device_data["id"]
-            for device in self.parsed_devices.values():
-                if did == device.did:
-                    device.set_available(False)
+            for device in self.get_devices_by_did(device_data["id"]):
+                device.set_available(False)
 
     # endregion
 
@@ -445,14 +1220,76 @@ class TerncyGateway:
         else:
             return asyncio.create_task(target)
 
+    @callback
+    def schedule_write(self, entity: TerncyEntity):
+        """Mark entity dirty, its state will be written in the next flush."""
+        if entity.unique_id in self._dirty_entities:
+            self.coalesced_writes += 1
+            return
+        self._dirty_entities[entity.unique_id] = entity
+        if self._flush_handle is None:
+            if self.coalesce_delay > 0:
+                self._flush_handle = self.hass.loop.call_later(
+                    self.coalesce_delay / 1000, self._flush_writes
+                )
+            else:
+                self._flush_handle = self.hass.loop.call_soon(self._flush_writes)
+
+    @callback
+    def _flush_writes(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        dirty_entities, self._dirty_entities = self._dirty_entities, {}
+        for entity in dirty_entities.values():
+            entity.async_flush_state()
+
     # endregion
 
     # region Setup
 
+    @contextmanager
+    def entity_batch(self) -> Iterator[None]:
+        """Defer adding new entities to HA until the outermost batch ends."""
+        self._entity_batch_depth += 1
+        try:
+            yield
+        finally:
+            self._entity_batch_depth -= 1
+            if self._entity_batch_depth == 0:
+                self._add_new_entities()
+
+    def _add_entity(self, entity: TerncyEntity):
+        self._new_entities.append(entity)
+        if self._entity_batch_depth == 0:
+            self._add_new_entities()
+
+    def _add_new_entities(self):
+        if not self._new_entities:
+            return
+        new_entities, self._new_entities = self._new_entities, []
+        ha_add_entities(self.hass, self.config_entry, new_entities)
+
     def add_device(self, eid: str, device: TerncyDevice):
         self.parsed_devices[eid] = device
+        self._did_eids.setdefault(device.did, set()).add(eid)
+
+    def remove_device(self, eid: str) -> TerncyDevice | None:
+        if device := self.parsed_devices.pop(eid, None):
+            if eids := self._did_eids.get(device.did):
+                eids.discard(eid)
+                if not eids:
+                    self._did_eids.pop(device.did)
+        return device
+
+    def get_devices_by_did(self, did: str) -> list[TerncyDevice]:
+        """Get all services (TerncyDevice) of a physical device."""
+        return [self.parsed_devices[eid] for eid in self._did_eids.get(did, ())]
 
     def setup_device_group(self, device_group_data: DeviceGroupData):
+        self._group_members[device_group_data["id"]] = list(
+            device_group_data.get("deviceUuids") or []
+        )
         # noinspection PyTypeChecker
         self.setup_device(device_group_data, [device_group_data])
 
@@ -460,9 +1297,12 @@ class TerncyGateway:
         """Got device data, create devices if not exist or update states."""
 
         model = device_data.get("model")
-        self.logger.debug("setup %s: %s", model, svc_list)
-
         did = device_data["id"]
+        if self.logger.isEnabledFor(logging.DEBUG) and self._debug_enabled(
+            did, *(svc["id"] for svc in svc_list)
+        ):
+            self.logger.debug("setup %s: %s", model, svc_list)
+
         sw_version = (
             str(device_data.get("version")) if "version" in device_data else UNDEFINED
         )
@@ -480,8 +1320,19 @@ class TerncyGateway:
                 suggested_area = device_room_name
 
         device_registry = dr.async_get(self.hass)
+        stats = self._refresh_stats
+
+        device_meta = (
+            model,
+            device_data.get("name"),
+            sw_version,
+            hw_version,
+            device_room,
+        )
+        device_meta_changed = self._device_meta.get(did) != device_meta
+        self._device_meta[did] = device_meta
 
-        if did == self.unique_id:
+        if did == self.unique_id and device_meta_changed:
             # update gateway details, because gateway has no svc_list
             device_registry.async_get_or_create(
                 config_entry_id=self.config_entry.entry_id,
@@ -504,8 +1355,11 @@ class TerncyGateway:
                 else:
                     name = eid
             attributes = svc.get("attributes", [])
+            svc_room = svc.get("room")
+            svc_meta = (device_meta, name, svc_room)
 
             device = self.parsed_devices.get(eid)
+            is_new = device is None
             if not device:
                 # self.logger.debug("New device: %s %s", did, eid)
 
@@ -513,21 +1367,13 @@ class TerncyGateway:
                 device = TerncyDevice(did, eid, profile)
 
                 if profile in PROFILES:
-                    if svc_room := svc.get("room"):
+                    if svc_room:
                         if svc_room_name := self.room_data.get(svc_room):
                             suggested_area = svc_room_name
-                    attrs = [a["attr"] for a in attributes]
-                    descriptions = [
-                        description
-                        for description in PROFILES.get(profile)
-                        if (
-                            not description.required_attrs
-                            or set(description.required_attrs).issubset(attrs)
-                        )
-                    ]
+                    descriptions = get_descriptions(profile, attributes)
                     if len(descriptions) > 0:
                         identifiers = {(DOMAIN, eid)}
-                        device_registry.async_get_or_create(
+                        device_entry = device_registry.async_get_or_create(
                             config_entry_id=self.config_entry.entry_id,
                             connections={(CONNECTION_ZIGBEE, eid)},
                             identifiers=identifiers,
@@ -539,66 +1385,194 @@ class TerncyGateway:
                             suggested_area=suggested_area,
                             via_device=(DOMAIN, self.unique_id),
                         )
+                        self._device_ids[eid] = device_entry.id
+                        self._svc_meta[eid] = svc_meta
                         self.add_device(eid, device)
                         for description in descriptions:
                             entity = create_entity(self, eid, description, attributes)
                             entity._attr_device_info = DeviceInfo(
                                 identifiers=identifiers
                             )
-                            ha_add_entity(self.hass, self.config_entry, entity)
+                            self._new_entities.append(entity)
                             device.entities.append(entity)
-                else:
+                elif self._debug_enabled(did, eid):
                     self.logger.debug(
                         "[%s] Unsupported profile:%d %s", eid, profile, attributes
                     )
-
-            # update states
+            elif self._svc_meta.get(eid) != svc_meta:
+                stats["registry_updated"] = stats.get("registry_updated", 0) + 1
+                if device_entry := device_registry.async_get_device(
+                    identifiers={(DOMAIN, eid)}
+                ):
+                    device_registry.async_update_device(
+                        device_entry.id,
+                        model=model,
+                        name=name,
+                        sw_version=sw_version,
+                        hw_version=hw_version,
+                    )
+                self._svc_meta[eid] = svc_meta
+            else:
+                stats["registry_skipped"] = stats.get("registry_skipped", 0) + 1
+
+            # update states only if any attribute changed since last delivery,
+            # with all attributes since entities derive state from several
+            states = self._states.get(eid, {})
+            changed = is_new or any(
+                (state := states.get(av["attr"])) is None or state[0] != av["value"]
+                for av in attributes
+            )
+            stat = "attrs_delivered" if changed else "attrs_skipped"
+            stats[stat] = stats.get(stat, 0) + len(attributes)
             device.set_available(online)
-            device.update_state(attributes)
+            self._cache_states(eid, attrs_to_map(attributes))
+            if changed:
+                device.update_state(attributes)
 
-    async def _fetch_data(self, ent_type: str) -> list:
+        if self._entity_batch_depth == 0:
+            self._add_new_entities()
+
+    async def _fetch_data(self, ent_type: str) -> list | None:
+        """Entities of a type, None if the hub didn't answer in time."""
         response = await self.api.get_entities(ent_type, True)
-        if "rsp" not in response:
+        if not response or "rsp" not in response:
             self.logger.warning("fetch %s error, response: %s", ent_type, response)
-        return response.get("rsp", {}).get("entities", [])
+            return None
+        return response["rsp"].get("entities", [])
 
     async def async_refresh_devices(self):
         """Get devices from terncy."""
         self.logger.debug("Fetching data...")
+        self._refresh_stats = {}
+
+        # 同时发出所有请求，再按 room -> device -> devicegroup -> scene 的顺序处理
+        fetches = {
+            ent_type: asyncio.create_task(self._fetch_data(ent_type))
+            for ent_type in ("room", "device", "devicegroup", "scene")
+        }
+        try:
+            with self.entity_batch():
+                await self._process_fetched(fetches)
+        finally:
+            for task in fetches.values():
+                task.cancel()  # 出错时取消还没完成的请求
 
+    async def _process_fetched(self, fetches: dict[str, asyncio.Task]):
         # room
-        lang = self.hass.config.language  # HA>=2022.12
-        default_rooms = DEFAULT_ROOMS.get(lang, DEFAULT_ROOMS.get("en"))
+        rooms: list[RoomData] | None = None
         try:
-            rooms: list[RoomData] = await self._fetch_data("room")
-            self.room_data = {
-                room["id"]: room["name"] or default_rooms.get(room["id"], "")
-                for room in rooms
-            }
-            self.logger.debug("ROOM %s: %s", lang, self.room_data)
+            if (rooms := await fetches["room"]) is not None:
+                self._setup_rooms(rooms)
         except Exception as e:
             self.logger.warning("fetch room error: %s", e)
 
         # device
-        devices: list[PhysicalDeviceData] = await self._fetch_data("device")
+        devices: list[PhysicalDeviceData] | None = await fetches["device"]
         # self.logger.debug("got devices %s", devices)
+        if devices is not None:
+            self._setup_devices(devices)
+
+        # device group
+        device_groups: list[DeviceGroupData] | None = await fetches["devicegroup"]
+        # self.logger.debug("got device_groups %s", device_groups)
+        if device_groups is not None:
+            self._setup_device_groups(device_groups)
+
+        # scene
+        scenes: list[SceneData] | None = await fetches["scene"]
+        if scenes is not None:
+            if self._debug_enabled():
+                self.logger.debug("SCENE: %s", scenes)
+            self._setup_scenes(scenes)
+
+        stats = self._refresh_stats
+        self.logger.info(
+            "Refreshed: registry %d updated, %d unchanged; "
+            "attributes %d delivered, %d unchanged",
+            stats.get("registry_updated", 0),
+            stats.get("registry_skipped", 0),
+            stats.get("attrs_delivered", 0),
+            stats.get("attrs_skipped", 0),
+        )
+        if rooms is None or devices is None or device_groups is None or scenes is None:
+            # a missing answer is not an empty hub, don't delete anything
+            self.logger.warning("Refresh incomplete, keep the topology snapshot")
+            return
+
+        self._reconcile_snapshot(devices, device_groups, scenes)
+        await self._snapshot_store.async_save(
+            {
+                "rooms": rooms,
+                "devices": devices,
+                "device_groups": device_groups,
+                "scenes": scenes,
+            }
+        )
+
+    async def async_restore_snapshot(self):
+        """Create entities from the topology saved by the last refresh.
 
+        So that entities exist before the hub is discovered and connected,
+        the next refresh reconciles them with the live topology.
+        """
+        if not (snapshot := await self._snapshot_store.async_load()):
+            return
+        self.logger.debug("Restore topology snapshot")
+        with self.entity_batch():
+            self._setup_rooms(snapshot.get("rooms", []))
+            self._setup_devices(snapshot.get("devices", []))
+            self._setup_device_groups(snapshot.get("device_groups", []))
+            self._setup_scenes(snapshot.get("scenes", []))
+            # states are stale and commands fail until connected,
+            # the refresh after connecting makes them available again
+            for device in self.parsed_devices.values():
+                device.set_available(False)
+            for scene in self.scenes.values():
+                scene.set_available(False)
+        self._restored_eids = set(self.parsed_devices)
+        self._restored_scenes = set(self.scenes)
+
+    def _reconcile_snapshot(
+        self,
+        devices: list[PhysicalDeviceData],
+        device_groups: list[DeviceGroupData],
+        scenes: list[SceneData],
+    ):
+        """Delete restored devices and scenes that are gone from the hub."""
+        if not self._restored_eids and not self._restored_scenes:
+            return
+        live_eids = {svc["id"] for d in devices for svc in d.get("services") or []}
+        if self.export_device_groups:
+            live_eids.update(device_group["id"] for device_group in device_groups)
+        for eid in self._restored_eids - live_eids:
+            self.logger.debug("%s is gone since last snapshot, delete it", eid)
+            self._delete_device(eid)
+        live_scenes = {scene["id"] for scene in scenes}
+        for scene_id in self._restored_scenes - live_scenes:
+            self._delete_scene(scene_id)
+        self._restored_eids = set()
+        self._restored_scenes = set()
+
+    def _setup_rooms(self, rooms: list[RoomData]):
+        lang = self.hass.config.language  # HA>=2022.12
+        default_rooms = DEFAULT_ROOMS.get(lang, DEFAULT_ROOMS.get("en"))
+        self.room_data = {
+            room["id"]: room["name"] or default_rooms.get(room["id"], "")
+            for room in rooms
+        }
+        self.logger.debug("ROOM %s: %s", lang, self.room_data)
+
+    def _setup_devices(self, devices: list[PhysicalDeviceData]):
         for device_data in devices:
             svc_list = device_data.get("services", [])
             self.setup_device(device_data, svc_list)
 
-        # device group
-        device_groups: list[DeviceGroupData] = await self._fetch_data("devicegroup")
-        # self.logger.debug("got device_groups %s", device_groups)
-
+    def _setup_device_groups(self, device_groups: list[DeviceGroupData]):
         if self.export_device_groups:
             for device_group_data in device_groups:
                 self.setup_device_group(device_group_data)
 
-        # scene
-        scenes: list[SceneData] = await self._fetch_data("scene")
-        self.logger.debug("SCENE: %s", scenes)
-
+    def _setup_scenes(self, scenes: list[SceneData]):
         if self.export_scenes:
             # 创建一个共用的设备，里面放所有的场景开关
             device_registry = dr.async_get(self.hass)
@@ -626,7 +1600,8 @@ class TerncyGateway:
                 entity.set_available(False)
             return
 
-        self.logger.debug("setup %s %s", scene_id, scene_data)
+        if self._debug_enabled(scene_id):
+            self.logger.debug("setup %s %s", scene_id, scene_data)
 
         name = scene_data.get("name") or scene_id  # some name is ""
         online = scene_data.get("online", True)
@@ -643,12 +1618,14 @@ class TerncyGateway:
             identifiers = {(DOMAIN, f"{self.unique_id}_scenes")}
             entity = create_entity(self, scene_id, description, init_states)
             entity._attr_device_info = DeviceInfo(identifiers=identifiers)
-            ha_add_entity(self.hass, self.config_entry, entity)
+            self._add_entity(entity)
             self.scenes[scene_id] = entity
-        else:
+        elif entity._attr_name != name:
             entity._attr_name = name
+            if entity.hass:
+                entity.async_write_ha_state()
 
         entity.set_available(online)
-        entity.update_state(init_states)
+        entity.update_state(attrs_to_map(init_states))
 
     # endregion
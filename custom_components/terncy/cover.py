@@ -13,8 +13,8 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .hass.entity import TerncyEntity
 from .hass.entity_descriptions import TerncyCoverDescription
-from .types import AttrValue
-from .utils import get_attr_value
+from .types import AttrMap, AttrValue
+from .utils import attrs_to_map
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,8 +30,8 @@ K_CURTAIN_MOTOR_STATUS = "curtainMotorStatus"
 K_TILT_ANGLE = "tiltAngle"
 
 
-def get_tilt_angle(attrs: list[AttrValue]) -> int | None:
-    tilt_angle = get_attr_value(attrs, K_TILT_ANGLE)
+def get_tilt_angle(attrs: AttrMap) -> int | None:
+    tilt_angle = attrs.get(K_TILT_ANGLE)
     if tilt_angle is not None and -90 <= tilt_angle <= 90:
         return tilt_angle
     return None
@@ -40,7 +40,7 @@ def get_tilt_angle(attrs: list[AttrValue]) -> int | None:
 def _create_entity(
     gateway, eid: str, description: TerncyCoverDescription, init_states: list[AttrValue]
 ):
-    if get_tilt_angle(init_states) is not None:
+    if get_tilt_angle(attrs_to_map(init_states)) is not None:
         return TerncyTiltCover(gateway, eid, description, init_states)
     else:
         return TerncyCover(gateway, eid, description, init_states)
@@ -58,15 +58,14 @@ class TerncyCover(TerncyEntity, CoverEntity):
         | CoverEntityFeature.STOP
     )
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (value := get_attr_value(attrs, K_CURTAIN_PERCENT)) is not None:
+        if (value := attrs.get(K_CURTAIN_PERCENT)) is not None:
             self._attr_current_cover_position = value
-        if (motor_status := get_attr_value(attrs, K_CURTAIN_MOTOR_STATUS)) is not None:
+        if (motor_status := attrs.get(K_CURTAIN_MOTOR_STATUS)) is not None:
             self._attr_is_opening = motor_status == 1
             self._attr_is_closing = motor_status == 2
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     @property
     def is_closed(self) -> bool | None:
@@ -77,26 +76,26 @@ class TerncyCover(TerncyEntity, CoverEntity):
         """Open the cover."""
         _LOGGER.debug("%s async_open_cover: %s", self.eid, kwargs)
         await self.api.set_attribute(self.eid, K_CURTAIN_PERCENT, 100)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_close_cover(self, **kwargs):
         """Close cover."""
         _LOGGER.debug("%s async_close_cover: %s", self.eid, kwargs)
         await self.api.set_attribute(self.eid, K_CURTAIN_PERCENT, 0)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_set_cover_position(self, **kwargs):
         """Move the cover to a specific position."""
         _LOGGER.debug("%s async_set_cover_position: %s", self.eid, kwargs)
         percent = kwargs[ATTR_POSITION]
         await self.api.set_attribute(self.eid, K_CURTAIN_PERCENT, percent)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_stop_cover(self, **kwargs) -> None:
         """Stop the cover."""
         _LOGGER.debug("%s async_stop_cover: %s", self.eid, kwargs)
         await self.api.set_attribute(self.eid, K_CURTAIN_MOTOR_STATUS, 0)
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
 
 class TerncyTiltCover(TerncyCover):
@@ -123,7 +122,7 @@ class TerncyTiltCover(TerncyCover):
             return None
         return 100 - round(abs(self._tilt_angle) / 0.9)
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         # _LOGGER.debug("[%s] <= %s", self.unique_id, attrs)
         if (tilt_angle := get_tilt_angle(attrs)) is not None:
             self._tilt_angle = tilt_angle
@@ -59,9 +59,8 @@ async def async_get_triggers(hass: HomeAssistant, device_id: str) -> list[dict]:
     eid = min(device_entry.identifiers)[1]
     _LOGGER.debug("async_get_triggers %s %s", device_id, eid)
     for gateway in hass.data[DOMAIN].values():
-        for device in gateway.parsed_devices.values():
-            if eid == device.eid:
-                triggers.extend(device.get_triggers(device_id))
+        if device := gateway.parsed_devices.get(eid):
+            triggers.extend(device.get_triggers(device_id))
 
     return triggers
 
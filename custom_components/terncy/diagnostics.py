@@ -0,0 +1,140 @@
+"""Diagnostics support for Terncy."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_TOKEN, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+
+from .const import DOMAIN
+from .core.device import TerncyDevice
+from .core.gateway import TerncyGateway
+from .profiles import descriptions_cache_info
+
+TO_REDACT = {
+    CONF_TOKEN,
+    CONF_USERNAME,
+    "token_id",
+    "identifier",
+    "identifiers",
+    "connections",
+}
+
+
+def _gateway_diagnostics(gateway: TerncyGateway) -> dict[str, Any]:
+    """Connection state and counters, independent of the number of devices."""
+    return {
+        "connection": {
+            "connected": gateway.is_connected,
+            "ip": gateway.api.ip,
+            "reconnects": gateway.reconnects,
+            "connect_attempts": gateway.connect_attempts,
+            "connect_failures": gateway.connect_failures,
+            "next_reconnect_delay": gateway.reconnect_delay,
+            "disconnects_absorbed": gateway.disconnects_absorbed,
+        },
+        "events": {
+            event_type: {
+                "count": count,
+                "handle_time_ms": round(gateway.event_handle_time[event_type] * 1000),
+            }
+            for event_type, count in gateway.event_counts.items()
+        },
+        "ingress": {
+            "depth": gateway.ingress_depth,
+            "max_depth": gateway.ingress_max_depth,
+            "lag_ms": round(gateway.ingress_lag * 1000, 1),
+            "max_lag_ms": round(gateway.ingress_max_lag * 1000, 1),
+            "merged": gateway.ingress_merged,
+            "overflow": gateway.ingress_overflow,
+        },
+        "reports": {
+            "received": gateway.reports_received,
+            "merged": gateway.reports_merged,
+            "delivered": gateway.reports_delivered,
+        },
+        "state_writes": {
+            "suppressed": gateway.suppressed_writes,
+            "coalesced": gateway.coalesced_writes,
+        },
+        "commands": {
+            "sent": gateway.commands_sent,
+            "coalesced": gateway.commands_coalesced,
+            "unacked": gateway.commands_unacked,
+            "group": gateway.group_commands,
+            "burst": gateway.burst_commands,
+            "ack_latency_ms": _percentiles(gateway.ack_latency),
+            "confirm_latency_ms": _percentiles(gateway.confirm_latency),
+        },
+        "descriptions_cache": descriptions_cache_info(),
+    }
+
+
+def _percentiles(window) -> dict[str, Any]:
+    return {
+        "samples": window.count,
+        **{f"p{p}": window.percentile(p) for p in (50, 95, 99)},
+    }
+
+
+def _device_diagnostics(gateway: TerncyGateway, device: TerncyDevice) -> dict:
+    return {
+        "did": device.did,
+        "profile": device.profile,
+        "listeners": gateway.listener_count(device.eid),
+        "states": gateway.get_states(device.eid),
+        "entities": [
+            {
+                "unique_id": entity.unique_id,
+                "entity_id": entity.entity_id,
+                "available": entity.available,
+            }
+            for entity in device.entities
+        ],
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    gateway: TerncyGateway = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "gateway": _gateway_diagnostics(gateway),
+        "rooms": gateway.room_data,
+        "scenes": {
+            eid: {
+                "entity_id": scene.entity_id,
+                "listeners": gateway.listener_count(eid),
+            }
+            for eid, scene in gateway.scenes.items()
+        },
+        "devices": {
+            eid: _device_diagnostics(gateway, device)
+            for eid, device in gateway.parsed_devices.items()
+        },
+    }
+
+
+async def async_get_device_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry, device: DeviceEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a device."""
+    gateway: TerncyGateway = hass.data[DOMAIN][entry.entry_id]
+    eids = [value for domain, value in device.identifiers if domain == DOMAIN]
+    return {
+        "device": {"name": device.name, "model": device.model},
+        "gateway": _gateway_diagnostics(gateway),
+        "services": {
+            eid: _device_diagnostics(gateway, gateway.parsed_devices[eid])
+            for eid in eids
+            if eid in gateway.parsed_devices
+        },
+    }
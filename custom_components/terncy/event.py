@@ -9,6 +9,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .hass.entity import TerncyEntity
 from .hass.entity_descriptions import TerncyEventDescription
+from .types import AttrMap
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,7 +33,7 @@ class TerncyEvent(TerncyEntity, EventEntity):
                     device.add_event_listener(event_type, self.trigger_event)
                 )
 
-    def update_state(self, attrs):
+    def update_state(self, attrs: AttrMap):
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
         # do nothing
         pass
@@ -27,20 +27,26 @@ def create_entity(
     return cls(gateway, eid, description, init_states)
 
 
-def ha_add_entity(hass: HomeAssistant, config_entry: ConfigEntry, entity: TerncyEntity):
-    """Add entity to HA"""
-    domain = str(entity.entity_description.PLATFORM)
+def ha_add_entities(
+    hass: HomeAssistant, config_entry: ConfigEntry, entities: list[TerncyEntity]
+):
+    """Add entities to HA, one async_add_entities call per platform."""
     config_entry_id = config_entry.entry_id
     registry = er.async_get(hass)
-    gateway = entity.gateway
-    if entity_id := registry.async_get_entity_id(domain, DOMAIN, entity.unique_id):
-        if entity_entry := registry.async_get(entity_id):
-            if entity_entry.config_entry_id != config_entry_id:
-                gateway.logger.debug(
-                    "entity %s already exists, skip",
-                    entity.unique_id,
-                )
-                return
-    gateway.logger.debug("created entity %s", entity.unique_id)
-    async_add_entities = TerncyEntity.ADD[f"{config_entry_id}.{domain}"]
-    async_add_entities([entity], update_before_add=False)
+    by_domain: dict[str, list[TerncyEntity]] = {}
+    for entity in entities:
+        domain = str(entity.entity_description.PLATFORM)
+        gateway = entity.gateway
+        if entity_id := registry.async_get_entity_id(domain, DOMAIN, entity.unique_id):
+            if entity_entry := registry.async_get(entity_id):
+                if entity_entry.config_entry_id != config_entry_id:
+                    gateway.logger.debug(
+                        "entity %s already exists, skip",
+                        entity.unique_id,
+                    )
+                    continue
+        gateway.logger.debug("created entity %s", entity.unique_id)
+        by_domain.setdefault(domain, []).append(entity)
+    for domain, domain_entities in by_domain.items():
+        async_add_entities = TerncyEntity.ADD[f"{config_entry_id}.{domain}"]
+        async_add_entities(domain_entities, update_before_add=False)
@@ -1,13 +1,14 @@
 from collections.abc import Callable
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from homeassistant.core import callback
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .entity_descriptions import TerncyEntityDescription
 from ..const import DOMAIN
-from ..types import AttrValue
+from ..types import AttrMap, AttrValue
 
 if TYPE_CHECKING:
     from ..core.gateway import TerncyGateway
@@ -28,6 +29,11 @@ class TerncyEntity(Entity):
     entity_description: TerncyEntityDescription
     _attr_should_poll: bool = False
 
+    _written_state: tuple | None = None
+    """上次写入HA的状态快照，用于跳过没有变化的写入"""
+
+    _seeding: bool = False
+
     def __init__(
         self,
         gateway: "TerncyGateway",
@@ -54,16 +60,62 @@ class TerncyEntity(Entity):
     def api(self):
         return self.gateway
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         raise NotImplementedError
 
     def set_available(self, available):
         self._attr_available = available
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
+
+    def _state_snapshot(self) -> tuple[Any, ...]:
+        """What HA would see from this entity, used to detect changes."""
+        return (
+            self.available,
+            self.state,
+            self.state_attributes,
+            self.extra_state_attributes,
+            self.icon,
+        )
+
+    @callback
+    def async_write_ha_state_if_changed(self) -> None:
+        """Write the state to HA only if it differs from the last written one.
+
+        If the gateway coalesces writes, the write is deferred to its next flush.
+        """
+        if not self.hass or self._seeding:
+            return
+        if self.gateway.coalesce_writes:
+            self.gateway.schedule_write(self)
+        else:
+            self.async_flush_state()
+
+    @callback
+    def async_flush_state(self) -> None:
+        if not self.hass:
+            return
+        snapshot = self._state_snapshot()
+        if snapshot == self._written_state:
+            self.gateway.suppressed_writes += 1
+            return
+        super().async_write_ha_state()
+        self._written_state = snapshot
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        # unconditional write, forget the snapshot so the next check writes again
+        self._written_state = None
+        super().async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
         self.async_on_remove(self.gateway.add_listener(self.eid, self.update_state))
+        if states := self.gateway.get_states(self.eid):
+            # start from the last known states, HA writes the state after this
+            self._seeding = True
+            try:
+                self.update_state(states)
+            finally:
+                self._seeding = False
 
     def _migrate_from_old_entity(self, hass, description: TerncyEntityDescription):
         """Migrate from old entity_id"""
@@ -24,6 +24,7 @@ from homeassistant.const import (
     PERCENTAGE,
     Platform,
     UnitOfTemperature,
+    UnitOfTime,
 )
 
 if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 3):
@@ -197,6 +198,19 @@ class BatteryDescription(TerncySensorDescription):
     value_attr: str = "battery"
 
 
+@dataclass(frozen=FROZEN_ENTITY_DESCRIPTION, kw_only=True)
+class GatewayLatencyDescription(SensorEntityDescription):
+    """网关自己的诊断传感器，命令延迟的百分位数"""
+
+    has_entity_name: bool = True
+    device_class: SensorDeviceClass = SensorDeviceClass.DURATION
+    native_unit_of_measurement: UnitOfTime = UnitOfTime.MILLISECONDS
+    state_class: SensorStateClass = SensorStateClass.MEASUREMENT
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    window: str  # ack / confirm，网关上的 LatencyWindow
+    percentile: int
+
+
 # endregion
 
 # region Switch
@@ -1,17 +1,20 @@
 """Hub monitor for the Terncy integration."""
 
+import asyncio
 import ipaddress
 import logging
-import time
 from typing import ForwardRef
 
 from homeassistant.components import zeroconf as hasszeroconf
 from homeassistant.const import CONF_PORT
+from homeassistant.core import callback
 from zeroconf import ServiceBrowser
+from zeroconf.asyncio import AsyncServiceInfo
 
 from .const import (
     CONF_DEVID,
     CONF_IP,
+    CONF_IPS,
     TERNCY_EVENT_SVC_ADD,
     TERNCY_EVENT_SVC_REMOVE,
     TERNCY_EVENT_SVC_UPDATE,
@@ -20,16 +23,22 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
+RESOLVE_MAX_ATTEMPTS = 10
+RESOLVE_INITIAL_DELAY = 0.5  # seconds, doubled after each attempt
+RESOLVE_MAX_DELAY = 10
+RESOLVE_TIMEOUT_MS = 3000
+
 
 def _parse_svc(dev_id, info):
     txt_records = {CONF_DEVID: dev_id}
-    ip_addr = ""
-    if len(info.addresses) > 0:
-        if len(info.addresses[0]) == 4:
-            ip_addr = str(ipaddress.IPv4Address(info.addresses[0]))
-        if len(info.addresses[0]) == 16:
-            ip_addr = str(ipaddress.IPv6Address(info.addresses[0]))
-    txt_records[CONF_IP] = ip_addr
+    ip_addrs = []
+    for address in info.addresses:
+        if len(address) == 4:
+            ip_addrs.append(str(ipaddress.IPv4Address(address)))
+        if len(address) == 16:
+            ip_addrs.append(str(ipaddress.IPv6Address(address)))
+    txt_records[CONF_IP] = ip_addrs[0] if ip_addrs else ""
+    txt_records[CONF_IPS] = ip_addrs
     txt_records[CONF_PORT] = info.port
     for k in info.properties:
         if info.properties[k] is not None:
@@ -38,7 +47,11 @@ def _parse_svc(dev_id, info):
 
 
 class TerncyZCListener:
-    """Terncy zeroconf discovery listener."""
+    """Terncy zeroconf discovery listener.
+
+    The callbacks run in the zeroconf thread, hubs are handed over to the
+    manager on the event loop.
+    """
 
     def __init__(self, manager: ForwardRef("TerncyHubManager")):
         """Create Terncy discovery listener."""
@@ -48,10 +61,9 @@ class TerncyZCListener:
         """Get a terncy service removed event."""
         _LOGGER.debug("remove_service %s %s", svc_type, name)
         dev_id = name.replace("." + svc_type, "")
-        if dev_id in self.manager.hubs:
-            del self.manager.hubs[dev_id]
-        txt_records = {CONF_DEVID: dev_id}
-        self.manager.hass.bus.fire(TERNCY_EVENT_SVC_REMOVE, txt_records)
+        self.manager.hass.loop.call_soon_threadsafe(
+            self.manager.async_remove_hub, name, dev_id
+        )
 
     def update_service(self, zconf, svc_type, name):
         """Get a terncy service updated event."""
@@ -62,8 +74,9 @@ class TerncyZCListener:
         dev_id = name.replace("." + svc_type, "")
         txt_records = _parse_svc(dev_id, info)
 
-        self.manager.hubs[dev_id] = txt_records
-        self.manager.hass.bus.fire(TERNCY_EVENT_SVC_UPDATE, txt_records)
+        self.manager.hass.loop.call_soon_threadsafe(
+            self.manager.async_set_hub, TERNCY_EVENT_SVC_UPDATE, txt_records
+        )
 
     def add_service(self, zconf, svc_type, name):
         """Get a new terncy service discovered event."""
@@ -72,21 +85,18 @@ class TerncyZCListener:
             return
         _LOGGER.debug("add_service %s %s %s", svc_type, name, info)
         dev_id = name.replace("." + svc_type, "")
-        txt_records = {}
-        max_retry = 20
-        while max_retry > 0:
-            max_retry = max_retry - 1
-            txt_records = _parse_svc(dev_id, info)
-            ipaddress = txt_records[CONF_IP]
-            _LOGGER.debug("ip address is parsed to %s", ipaddress)
-            if not ipaddress == "":
-                break
-            _LOGGER.warning("ip %s is still not available, query again", ipaddress)
-            time.sleep(2)
-            info = zconf.get_service_info(svc_type, name)
-
-        self.manager.hubs[dev_id] = txt_records
-        self.manager.hass.bus.fire(TERNCY_EVENT_SVC_ADD, txt_records)
+        txt_records = _parse_svc(dev_id, info)
+        _LOGGER.debug("ip address is parsed to %s", txt_records[CONF_IP])
+        if txt_records[CONF_IP] == "":
+            # don't block the zeroconf thread, resolve it on the event loop
+            self.manager.hass.loop.call_soon_threadsafe(
+                self.manager.async_resolve_hub, zconf, svc_type, name, txt_records
+            )
+            return
+
+        self.manager.hass.loop.call_soon_threadsafe(
+            self.manager.async_set_hub, TERNCY_EVENT_SVC_ADD, txt_records
+        )
 
 
 class TerncyHubManager:
@@ -100,6 +110,7 @@ class TerncyHubManager:
         self._browser = None
         self._discovery_engine = None
         self.hubs = {}
+        self._resolving: dict[str, asyncio.Task] = {}  # key: service name
         TerncyHubManager.__instance = self
 
     @staticmethod
@@ -117,8 +128,65 @@ class TerncyHubManager:
             listener = TerncyZCListener(self)
             self._browser = ServiceBrowser(zconf, TERNCY_HUB_SVC_NAME, listener)
 
+    @callback
+    def async_set_hub(self, event_type: str, txt_records: dict):
+        """Save a discovered hub and notify gateways, must run in the event loop."""
+        self.hubs[txt_records[CONF_DEVID]] = txt_records
+        self.hass.bus.async_fire(event_type, txt_records)
+
+    @callback
+    def async_remove_hub(self, name: str, dev_id: str):
+        """Forget a removed hub and notify gateways, must run in the event loop."""
+        if task := self._resolving.pop(name, None):
+            task.cancel()
+        self.hubs.pop(dev_id, None)
+        self.hass.bus.async_fire(TERNCY_EVENT_SVC_REMOVE, {CONF_DEVID: dev_id})
+
+    @callback
+    def async_resolve_hub(self, zconf, svc_type: str, name: str, txt_records: dict):
+        """Query the address of a hub in background until it's available."""
+        if name in self._resolving:
+            return
+        self._resolving[name] = self.hass.loop.create_task(
+            self._async_resolve_hub(zconf, svc_type, name, txt_records)
+        )
+
+    async def _async_resolve_hub(
+        self, zconf, svc_type: str, name: str, txt_records: dict
+    ):
+        """Fill in the address of txt_records, the other records are kept."""
+        dev_id = txt_records[CONF_DEVID]
+        delay = RESOLVE_INITIAL_DELAY
+        try:
+            for _ in range(RESOLVE_MAX_ATTEMPTS):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RESOLVE_MAX_DELAY)
+                info = AsyncServiceInfo(svc_type, name)
+                if not await info.async_request(zconf, RESOLVE_TIMEOUT_MS):
+                    continue
+                resolved = _parse_svc(dev_id, info)
+                if resolved[CONF_IP] != "":
+                    _LOGGER.debug("ip address is resolved to %s", resolved[CONF_IP])
+                    txt_records = {
+                        **txt_records,
+                        CONF_IP: resolved[CONF_IP],
+                        CONF_IPS: resolved[CONF_IPS],
+                    }
+                    break
+                _LOGGER.warning("ip of %s is still not available, query again", name)
+            else:
+                # still save the full record, like before resolving in background
+                _LOGGER.warning("ip of %s is not available, give up", name)
+        finally:
+            self._resolving.pop(name, None)
+
+        self.async_set_hub(TERNCY_EVENT_SVC_ADD, txt_records)
+
     async def stop_discovery(self):
         """Stop terncy discovery engine."""
+        for task in self._resolving.values():
+            task.cancel()
+        self._resolving.clear()
         if self._discovery_engine:
             self._browser.cancel()
             self._discovery_engine.close()
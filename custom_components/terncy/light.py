@@ -17,8 +17,7 @@ from homeassistant.util import color as color_util
 
 from .hass.entity import TerncyEntity
 from .hass.entity_descriptions import TerncyLightDescription
-from .types import AttrValue
-from .utils import get_attr_value
+from .types import AttrMap, AttrValue
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -57,25 +56,24 @@ class TerncyLight(TerncyEntity, LightEntity):
         if ColorMode.HS in self.supported_color_modes:
             self._attr_hs_color = (0.0, 0.0)
 
-    def update_state(self, attrs):
+    def update_state(self, attrs: AttrMap):
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (on_off := get_attr_value(attrs, "on")) is not None:
+        if (on_off := attrs.get("on")) is not None:
             self._attr_is_on = on_off == 1
-        bri = get_attr_value(attrs, "brightness")
+        bri = attrs.get("brightness")
         if bri:
             self._attr_brightness = int(bri / 100 * 255)
-        if color_temp_mired := get_attr_value(attrs, "colorTemperature"):
+        if color_temp_mired := attrs.get("colorTemperature"):
             self._attr_color_temp_kelvin = color_util.color_temperature_mired_to_kelvin(color_temp_mired)
             self._attr_color_mode = ColorMode.COLOR_TEMP
-        hue = get_attr_value(attrs, "hue")
-        sat = get_attr_value(attrs, "saturation")
+        hue = attrs.get("hue")
+        sat = attrs.get("saturation")
         if hue is not None or sat is not None:
             hue = int(hue / 255 * 360.0) if hue is not None else self._attr_hs_color[0] if hasattr(self, "_attr_hs_color") else 0.0
             sat = int(sat / 255 * 100) if sat is not None else self._attr_hs_color[1] if hasattr(self, "_attr_hs_color") else 0.0
             self._attr_hs_color = (hue, sat)
             self._attr_color_mode = ColorMode.HS
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_turn_on(self, **kwargs):
         _LOGGER.debug("%s async_turn_on %s", self.eid, kwargs)
@@ -109,14 +107,16 @@ class TerncyLight(TerncyEntity, LightEntity):
             self._attr_hs_color = hs_color
             self._attr_color_mode = ColorMode.HS
 
-        await self.api.set_attributes(self.eid, attrs)
-        self.async_write_ha_state()
+        await self.api.fan_out_attributes(self._context, self.eid, attrs)
+        self.async_write_ha_state_if_changed()
 
     async def async_turn_off(self, **kwargs):
         _LOGGER.debug("%s async_turn_off %s", self.eid, kwargs)
         self._attr_is_on = False
-        await self.api.set_attribute(self.eid, "on", 0)
-        self.async_write_ha_state()
+        await self.api.fan_out_attributes(
+            self._context, self.eid, [{"attr": "on", "value": 0}]
+        )
+        self.async_write_ha_state_if_changed()
 
 
 TerncyEntity.NEW["light"] = TerncyLight
@@ -1,7 +1,49 @@
+from functools import lru_cache
+
 from homeassistant.const import MAJOR_VERSION, MINOR_VERSION
 
+from ..hass.entity_descriptions import TerncyEntityDescription
+from ..types import AttrValue
 
 if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 7):
     from .profiles import PROFILES
 else:
     from .before_2023_7 import PROFILES
+
+# profile: ((description, required_attrs), ...)，加载时算好，不用每次建 set
+PROFILE_REQUIREMENTS: dict[
+    int, tuple[tuple[TerncyEntityDescription, frozenset[str]], ...]
+] = {
+    profile: tuple(
+        (description, frozenset(description.required_attrs or ()))
+        for description in descriptions
+    )
+    for profile, descriptions in PROFILES.items()
+}
+
+
+@lru_cache(maxsize=None)
+def _resolve_descriptions(
+    profile: int, attr_names: frozenset[str]
+) -> tuple[TerncyEntityDescription, ...]:
+    return tuple(
+        description
+        for description, required_attrs in PROFILE_REQUIREMENTS.get(profile, ())
+        if required_attrs <= attr_names
+    )
+
+
+def get_descriptions(
+    profile: int, attributes: list[AttrValue]
+) -> tuple[TerncyEntityDescription, ...]:
+    """Descriptions of the profile whose required attrs are all in attributes.
+
+    Memoized by (profile, attribute names), identical devices share the result.
+    """
+    return _resolve_descriptions(profile, frozenset(a["attr"] for a in attributes))
+
+
+def descriptions_cache_info() -> dict[str, int]:
+    """Hit/miss counts of get_descriptions, for diagnostics."""
+    info = _resolve_descriptions.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
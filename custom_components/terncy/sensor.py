@@ -1,22 +1,54 @@
 """Sensor platform support for Terncy."""
 
 import logging
+from datetime import timedelta
+from typing import TYPE_CHECKING
 
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import MAJOR_VERSION, MINOR_VERSION
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 9):
+    from homeassistant.helpers.device_registry import DeviceInfo
+else:
+    from homeassistant.helpers.entity import DeviceInfo
+
+from .const import DOMAIN
 from .hass.entity import TerncyEntity
-from .hass.entity_descriptions import TerncySensorDescription
-from .utils import get_attr_value
+from .hass.entity_descriptions import GatewayLatencyDescription, TerncySensorDescription
+from .types import AttrMap
+
+if TYPE_CHECKING:
+    from .core.gateway import TerncyGateway
 
 _LOGGER = logging.getLogger(__name__)
 
+SCAN_INTERVAL = timedelta(seconds=60)  # 只有网关的诊断传感器轮询
+
+GATEWAY_LATENCY_SENSORS = [
+    GatewayLatencyDescription(
+        key=f"command_{window}_p{percentile}",
+        translation_key=f"command_{window}_p{percentile}",
+        window=window,
+        percentile=percentile,
+    )
+    for window in ("ack", "confirm")
+    for percentile in (50, 95, 99)
+]
+
 
 async def async_setup_entry(
     hass, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ):
     TerncyEntity.ADD[f"{entry.entry_id}.sensor"] = async_add_entities
+    gateway: "TerncyGateway" = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities(
+        [
+            TerncyGatewayLatencySensor(gateway, description)
+            for description in GATEWAY_LATENCY_SENSORS
+        ]
+    )
 
 
 class TerncySensor(TerncyEntity, SensorEntity):
@@ -24,15 +56,30 @@ class TerncySensor(TerncyEntity, SensorEntity):
 
     entity_description: TerncySensorDescription
 
-    def update_state(self, attrs):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (
-            value := get_attr_value(attrs, self.entity_description.value_attr)
-        ) is not None:
+        if (value := attrs.get(self.entity_description.value_attr)) is not None:
             self._attr_native_value = self.entity_description.value_fn(value)
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
+
+
+class TerncyGatewayLatencySensor(SensorEntity):
+    """Command latency percentile of a gateway, polled."""
+
+    entity_description: GatewayLatencyDescription
+
+    def __init__(
+        self, gateway: "TerncyGateway", description: GatewayLatencyDescription
+    ):
+        self.gateway = gateway
+        self.entity_description = description
+        self._attr_unique_id = f"{gateway.unique_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, gateway.unique_id)})
+
+    async def async_update(self):
+        window = getattr(self.gateway, f"{self.entity_description.window}_latency")
+        self._attr_native_value = window.percentile(self.entity_description.percentile)
 
 
 TerncyEntity.NEW["sensor"] = TerncySensor
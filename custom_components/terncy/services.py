@@ -0,0 +1,118 @@
+"""Services of the Terncy integration."""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID, MAJOR_VERSION, MINOR_VERSION
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import config_validation as cv
+
+if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 7):
+    from homeassistant.core import SupportsResponse
+
+from .const import DOMAIN, SERVICE_SET_ATTRIBUTES_BULK
+
+if TYPE_CHECKING:
+    from .core.gateway import TerncyGateway
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_ATTRIBUTES = "attributes"
+ATTR_COMMANDS = "commands"
+ATTR_CONCURRENCY = "concurrency"
+ATTR_EID = "eid"
+ATTR_METHOD = "method"
+
+COMMAND_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Exclusive(ATTR_ENTITY_ID, "target"): cv.entity_id,
+            vol.Exclusive(ATTR_EID, "target"): cv.string,
+            vol.Required(ATTR_ATTRIBUTES): {cv.string: vol.Coerce(int)},
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ENTITY_ID, ATTR_EID),
+)
+
+SET_ATTRIBUTES_BULK_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_COMMANDS): vol.All(cv.ensure_list, [COMMAND_SCHEMA]),
+        vol.Optional(ATTR_METHOD, default=0): vol.Coerce(int),
+        vol.Optional(ATTR_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=64)
+        ),
+    }
+)
+
+
+def _index_targets(hass: HomeAssistant) -> dict[str, tuple["TerncyGateway", str]]:
+    """entity_id and eid of every Terncy entity: (gateway, eid)."""
+    targets: dict[str, tuple["TerncyGateway", str]] = {}
+    gateway: "TerncyGateway"
+    for gateway in hass.data.get(DOMAIN, {}).values():
+        entities = [e for d in gateway.parsed_devices.values() for e in d.entities]
+        entities.extend(gateway.scenes.values())
+        for entity in entities:
+            targets[entity.eid] = (gateway, entity.eid)
+            if entity.entity_id:
+                targets[entity.entity_id] = (gateway, entity.eid)
+    return targets
+
+
+async def _async_set_attributes_bulk(
+    hass: HomeAssistant, call: ServiceCall
+) -> dict[str, Any]:
+    targets = _index_targets(hass)
+    results: dict[str, dict[str, Any]] = {}
+    commands: dict["TerncyGateway", list] = {}  # 按网关分组
+    for command in call.data[ATTR_COMMANDS]:
+        target = command.get(ATTR_ENTITY_ID) or command[ATTR_EID]
+        if target not in targets:
+            results[target] = {"success": False, "error": "unknown target"}
+            continue
+        gateway, eid = targets[target]
+        attrs = [
+            {"attr": attr, "value": value}
+            for attr, value in command[ATTR_ATTRIBUTES].items()
+        ]
+        commands.setdefault(gateway, []).append((eid, attrs))
+
+    for gateway_results in await asyncio.gather(
+        *(
+            gateway.async_set_attributes_bulk(
+                gateway_commands,
+                call.data[ATTR_METHOD],
+                call.data.get(ATTR_CONCURRENCY),
+            )
+            for gateway, gateway_commands in commands.items()
+        )
+    ):
+        results.update(gateway_results)
+
+    _LOGGER.debug("%s: %s", SERVICE_SET_ATTRIBUTES_BULK, results)
+    return {"results": results}
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the services of the integration."""
+
+    async def set_attributes_bulk(call: ServiceCall):
+        return await _async_set_attributes_bulk(hass, call)
+
+    if (MAJOR_VERSION, MINOR_VERSION) >= (2023, 7):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SET_ATTRIBUTES_BULK,
+            set_attributes_bulk,
+            schema=SET_ATTRIBUTES_BULK_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+    else:
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SET_ATTRIBUTES_BULK,
+            set_attributes_bulk,
+            schema=SET_ATTRIBUTES_BULK_SCHEMA,
+        )
@@ -8,8 +8,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .hass.entity import TerncyEntity
 from .hass.entity_descriptions import TerncySwitchDescription
-from .types import AttrValue
-from .utils import get_attr_value
+from .types import AttrMap
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,33 +33,40 @@ class TerncyCommonSwitch(TerncyEntity, SwitchEntity):
 
     entity_description: TerncySwitchDescription
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        if (
-            value := get_attr_value(attrs, self.entity_description.value_attr)
-        ) is not None:
+        if (value := attrs.get(self.entity_description.value_attr)) is not None:
             self._attr_is_on = value == self.attr_value_on
-        if self.hass:
-            self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_turn_on(self, **kwargs):
         self._attr_is_on = True
-        await self.api.set_attribute(
+        await self.api.fan_out_attributes(
+            self._context,
             self.eid,
-            self.entity_description.value_attr,
-            self.attr_value_on,
+            [
+                {
+                    "attr": self.entity_description.value_attr,
+                    "value": self.attr_value_on,
+                }
+            ],
         )
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     async def async_turn_off(self, **kwargs):
         self._attr_is_on = False
-        await self.api.set_attribute(
+        await self.api.fan_out_attributes(
+            self._context,
             self.eid,
-            self.entity_description.value_attr,
-            self.attr_value_off,
+            [
+                {
+                    "attr": self.entity_description.value_attr,
+                    "value": self.attr_value_off,
+                }
+            ],
         )
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed()
 
     @property
     def attr_value_on(self):
@@ -76,16 +82,14 @@ class TerncyWallSwitch(TerncyCommonSwitch):
 
     _disableRelay: bool | None = None
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        for av in attrs:
-            if av["attr"] == ATTR_ON:
-                self._attr_is_on = av["value"] == 1
-            elif av["attr"] == ATTR_DISABLE_RELAY:
-                self._disableRelay = av["value"] == 1
-        if self.hass:
-            self.async_write_ha_state()
+        if (on := attrs.get(ATTR_ON)) is not None:
+            self._attr_is_on = on == 1
+        if (disable_relay := attrs.get(ATTR_DISABLE_RELAY)) is not None:
+            self._disableRelay = disable_relay == 1
+        self.async_write_ha_state_if_changed()
 
     @property
     def available(self) -> bool:
@@ -99,16 +103,14 @@ class DisableRelaySwitch(TerncyCommonSwitch):
 
     _pure_input: bool | None = None
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        for av in attrs:
-            if av["attr"] == ATTR_PURE_INPUT:
-                self._pure_input = av["value"] == 1
-            elif av["attr"] == ATTR_DISABLE_RELAY:
-                self._attr_is_on = av["value"] == 1
-        if self.hass:
-            self.async_write_ha_state()
+        if (pure_input := attrs.get(ATTR_PURE_INPUT)) is not None:
+            self._pure_input = pure_input == 1
+        if (disable_relay := attrs.get(ATTR_DISABLE_RELAY)) is not None:
+            self._attr_is_on = disable_relay == 1
+        self.async_write_ha_state_if_changed()
 
     @property
     def available(self) -> bool:
@@ -124,18 +126,16 @@ class DisabledRelayStatusSwitch(TerncyCommonSwitch):
     _pure_input: bool | None = None
     _disableRelay: bool | None = None
 
-    def update_state(self, attrs: list[AttrValue]):
+    def update_state(self, attrs: AttrMap):
         """Update terncy state."""
         # _LOGGER.debug("%s <= %s", self.eid, attrs)
-        for av in attrs:
-            if av["attr"] == ATTR_PURE_INPUT:
-                self._pure_input = av["value"] == 1
-            elif av["attr"] == ATTR_DISABLE_RELAY:
-                self._disableRelay = av["value"] == 1
-            elif av["attr"] == ATTR_DISABLED_RELAY_STATUS:
-                self._attr_is_on = av["value"] == 1
-        if self.hass:
-            self.async_write_ha_state()
+        if (pure_input := attrs.get(ATTR_PURE_INPUT)) is not None:
+            self._pure_input = pure_input == 1
+        if (disable_relay := attrs.get(ATTR_DISABLE_RELAY)) is not None:
+            self._disableRelay = disable_relay == 1
+        if (status := attrs.get(ATTR_DISABLED_RELAY_STATUS)) is not None:
+            self._attr_is_on = status == 1
+        self.async_write_ha_state_if_changed()
 
     @property
     def available(self) -> bool:
@@ -8,6 +8,10 @@ class AttrValue(TypedDict):
     value: int
 
 
+AttrMap = dict[str, int]
+"""list[AttrValue] 转换后的 {attr: value}，每条消息只转换一次"""
+
+
 class SvcData(TypedDict):
     """DeviceData
     这个结构对应HA里的Device
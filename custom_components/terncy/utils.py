@@ -1,9 +1,82 @@
 """The Terncy utils."""
 
+import asyncio
+import ipaddress
+import math
+from collections import deque
 
-def get_attr_value(attrs, key):
-    """Read attr value from terncy attributes."""
-    for att in attrs:
-        if "attr" in att and att["attr"] == key:
-            return att["value"]
-    return None
+
+def ip_family(ip: str) -> int:
+    """4 or 6"""
+    return ipaddress.ip_address(ip).version
+
+
+def url_host(ip: str) -> str:
+    """Host part of an url, IPv6 addresses need brackets."""
+    return f"[{ip}]" if ip_family(ip) == 6 else ip
+
+
+async def async_race_connect(
+    addresses: list[str], port: int, delay: float = 0.25, timeout: float = 5
+) -> str | None:
+    """Happy eyeballs: try addresses in order, each started `delay` seconds after
+    the previous one, return the first one accepting a TCP connection."""
+
+    async def attempt(index: int, ip: str) -> str:
+        await asyncio.sleep(index * delay)
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        writer.close()
+        return ip
+
+    tasks = [
+        asyncio.ensure_future(attempt(index, ip)) for index, ip in enumerate(addresses)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except (OSError, asyncio.TimeoutError):
+                continue
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def parse_debug_sampling(text: str) -> dict[str, int]:
+    """'report=10, keyPressed=2' -> {'report': 10, 'keyPressed': 2}"""
+    sampling = {}
+    for item in text.replace(";", ",").split(","):
+        event_type, _, rate = item.partition("=")
+        if event_type.strip() and rate.strip().isdigit() and int(rate) > 0:
+            sampling[event_type.strip()] = int(rate)
+    return sampling
+
+
+def parse_debug_eids(text: str) -> frozenset[str]:
+    return frozenset(eid for eid in text.replace(",", " ").split() if eid)
+
+
+def attrs_to_map(attrs):
+    """Convert terncy attributes to a dict of attr: value."""
+    return {att["attr"]: att["value"] for att in attrs if "attr" in att}
+
+
+class LatencyWindow:
+    """Rolling window of the last latency samples (ms)."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+        self.count = 0  # 总样本数，包括已滚出窗口的
+
+    def add(self, ms: float):
+        self._samples.append(ms)
+        self.count += 1
+
+    def percentile(self, p: float) -> float | None:
+        """Nearest-rank percentile of the window, None if empty."""
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        rank = max(math.ceil(p / 100 * len(samples)), 1)
+        return round(samples[rank - 1], 1)